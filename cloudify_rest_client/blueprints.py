@@ -22,11 +22,15 @@ import contextlib
 
 
 from cloudify_rest_client import bytes_stream_utils
-from cloudify_rest_client.responses import ListResponse
+from cloudify_rest_client.query import query_method
+from cloudify_rest_client.responses import ListResponse, lean_model
 from cloudify_rest_client import utils
 
 
 class Blueprint(dict):
+    FIELDS = (
+        'id', 'created_at', 'updated_at', 'main_file_name', 'plan',
+        'description', 'created_by', 'tenant_name', 'private_resource')
 
     def __init__(self, blueprint):
         super(Blueprint, self).__init__()
@@ -79,6 +83,9 @@ class Blueprint(dict):
         return self.get('description')
 
 
+LeanBlueprint = lean_model(Blueprint)
+
+
 class BlueprintsClient(object):
 
     def __init__(self, api):
@@ -95,8 +102,6 @@ class BlueprintsClient(object):
             query_params['application_file_name'] = \
                 urllib.quote(application_file_name)
 
-        uri = '/blueprints/{0}'.format(blueprint_id)
-
         # For a Windows path (e.g. "C:\aaa\bbb.zip") scheme is the
         # drive letter and therefore the 2nd condition is present
         if urlparse.urlparse(archive_location).scheme and \
@@ -109,10 +114,17 @@ class BlueprintsClient(object):
             data = bytes_stream_utils.request_data_file_stream_gen(
                 archive_location, progress_callback=progress_callback)
 
+        return self._put(blueprint_id, query_params, data)
+
+    def _put(self, blueprint_id, query_params, data):
+        uri = '/blueprints/{0}'.format(blueprint_id)
         return self.api.put(uri, params=query_params, data=data,
                             expected_status_code=201)
 
-    def list(self, _include=None, sort=None, is_descending=False, **kwargs):
+    query = query_method(Blueprint.FIELDS)
+
+    def list(self, _include=None, sort=None, is_descending=False,
+             lean=False, **kwargs):
         """
         Returns a list of currently stored blueprints.
 
@@ -121,6 +133,8 @@ class BlueprintsClient(object):
         :param is_descending: True for descending order, False for ascending.
         :param kwargs: Optional filter fields. For a list of available fields
                see the REST service's models.BlueprintState.fields
+        :param lean: Return memory-lean, read-only models instead of dicts
+                     (see `cloudify_rest_client.responses.LeanModel`).
         :return: Blueprints list.
         """
         params = kwargs
@@ -130,9 +144,23 @@ class BlueprintsClient(object):
         response = self.api.get('/blueprints',
                                 _include=_include,
                                 params=params)
-        return ListResponse([Blueprint(item) for item in response['items']],
+        model = LeanBlueprint if lean else Blueprint
+        return ListResponse([model(item) for item in response['items']],
                             response['metadata'])
 
+    def count(self, **kwargs):
+        """
+        Returns the number of blueprints matching the filters of `list`.
+        """
+        return utils.count(self.list, 'id', **kwargs)
+
+    def count_by(self, field, values, **kwargs):
+        """
+        Returns the number of blueprints per value of `field`, see
+        `cloudify_rest_client.utils.count_by`.
+        """
+        return utils.count_by(self.count, field, values, **kwargs)
+
     def publish_archive(self,
                         archive_location,
                         blueprint_id,
@@ -165,7 +193,18 @@ class BlueprintsClient(object):
         return Blueprint(blueprint)
 
     @staticmethod
-    def calc_size(blueprint_path):
+    def calc_size(blueprint_path, exact=False):
+        """
+        Returns the size of the archive `upload` sends for a blueprint.
+
+        :param blueprint_path: Main blueprint yaml file path.
+        :param exact: Whether to build the archive to get its exact size.
+         By default, the size is estimated from the files' sizes and
+         sampled compression ratios, without building the archive.
+        :return: The archive size, in bytes.
+        """
+        if not exact:
+            return utils.estimate_tar_blueprint_size(blueprint_path)
         tempdir = tempfile.mkdtemp()
         try:
             tar_path = utils.tar_blueprint(blueprint_path, tempdir)
@@ -194,20 +233,15 @@ class BlueprintsClient(object):
         Blueprint ID parameter is available for specifying the
         blueprint's unique Id.
         """
-        tempdir = tempfile.mkdtemp()
-        try:
-            tar_path = utils.tar_blueprint(blueprint_path, tempdir)
-            application_file = os.path.basename(blueprint_path)
-
-            blueprint = self._upload(
-                tar_path,
-                blueprint_id=blueprint_id,
-                application_file_name=application_file,
-                private_resource=private_resource,
-                progress_callback=progress_callback)
-            return Blueprint(blueprint)
-        finally:
-            shutil.rmtree(tempdir)
+        # the blueprint is archived while being uploaded
+        query_params = {
+            'private_resource': private_resource,
+            'application_file_name':
+                urllib.quote(os.path.basename(blueprint_path))
+        }
+        data = utils.tar_blueprint_stream(blueprint_path,
+                                          progress_callback=progress_callback)
+        return Blueprint(self._put(blueprint_id, query_params, data))
 
     def get(self, blueprint_id, _include=None):
         """
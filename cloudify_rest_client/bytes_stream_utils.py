@@ -14,6 +14,7 @@
 #    * limitations under the License.
 
 import os
+import uuid
 
 CONTENT_DISPOSITION_HEADER = 'content-disposition'
 DEFAULT_BUFFER_SIZE = 8192
@@ -46,6 +47,42 @@ def request_data_file_stream_gen(file_path,
                 return
 
 
+def multipart_stream_gen(fields, buffer_size=DEFAULT_BUFFER_SIZE):
+    """
+    Encode a multipart/form-data body as a stream, so that the parts'
+    content doesn't have to be available (or even known) in advance.
+    :param fields: dict mapping field names to (filename, content,
+     content type) tuples, where content is a file-like object or an
+     iterable of bytes chunks
+    :param buffer_size: Size of the chunks read from file-like objects
+    :return: (content type header value, generator object) tuple
+    """
+    boundary = uuid.uuid4().hex
+
+    def gen():
+        for name, (filename, content, content_type) in fields.items():
+            yield ('--{0}\r\n'
+                   'Content-Disposition: form-data; name="{1}"; '
+                   'filename="{2}"\r\n'
+                   'Content-Type: {3}\r\n\r\n'
+                   .format(boundary, name, filename,
+                           content_type or 'application/octet-stream')
+                   ).encode('utf-8')
+            if hasattr(content, 'read'):
+                while True:
+                    read_bytes = content.read(buffer_size)
+                    if not read_bytes:
+                        break
+                    yield read_bytes
+            else:
+                for chunk in content:
+                    yield chunk
+            yield b'\r\n'
+        yield '--{0}--\r\n'.format(boundary).encode('utf-8')
+
+    return 'multipart/form-data; boundary={0}'.format(boundary), gen()
+
+
 def write_response_stream_to_file(streamed_response,
                                   output_file=None,
                                   buffer_size=DEFAULT_BUFFER_SIZE,
@@ -307,10 +307,53 @@ class StreamedResponse(object):
     def lines_stream(self):
         return self._response.iter_lines()
 
+    def live_bytes_stream(self, max_chunk_size=8192):
+        """
+        Yields the received bytes as soon as they are received, rather
+        than once `chunk_size` bytes were received like `bytes_stream`.
+        """
+        read1 = getattr(self._response.raw, 'read1', None)
+        if read1 is None:
+            # older urllib3 versions, reading whatever was received isn't
+            # supported
+            for data in self._response.iter_content(chunk_size=1):
+                yield data
+            return
+        while True:
+            data = read1(max_chunk_size)
+            if not data:
+                return
+            yield data
+
+    def live_lines_stream(self):
+        """
+        Yields the received lines (without their line break) as soon as
+        they are received, e.g. for server-sent events.
+        """
+        return _split_lines(self.live_bytes_stream())
+
     def close(self):
         self._response.close()
 
 
+def _split_lines(chunks):
+    # a trailing carriage return may be followed by a line feed in the
+    # next chunk, so the line is only completed then
+    pending = []
+    for chunk in chunks:
+        pending.append(chunk)
+        if b'\n' not in chunk and b'\r' not in chunk:
+            continue
+        lines = b''.join(pending).splitlines(True)
+        pending = []
+        if lines[-1].endswith(b'\r') or not lines[-1].endswith(b'\n'):
+            pending.append(lines.pop())
+        for line in lines:
+            yield line.rstrip(b'\r\n')
+    for line in b''.join(pending).splitlines():
+        yield line
+
+
 class CloudifyClient(object):
     """Cloudify's management client."""
     client_class = HTTPClient
@@ -361,6 +404,9 @@ class CloudifyClient(object):
         self.events = EventsClient(self._client)
         self.search = SearchClient(self._client)
         self.evaluate = EvaluateClient(self._client)
+        # memoized evaluations depend on the node instances' state
+        self.node_instances.add_update_listener(
+            self.evaluate.on_node_instance_update)
         self.deployment_modifications = DeploymentModificationsClient(
             self._client)
         self.tokens = TokensClient(self._client)
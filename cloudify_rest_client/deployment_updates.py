@@ -15,14 +15,13 @@
 import os
 import json
 import urllib
-import shutil
 import urlparse
 import tempfile
 from mimetypes import MimeTypes
 
 from requests_toolbelt.multipart.encoder import MultipartEncoder
 
-from cloudify_rest_client import utils
+from cloudify_rest_client import bytes_stream_utils, utils
 from cloudify_rest_client.responses import ListResponse
 
 
@@ -89,17 +88,18 @@ class DeploymentUpdatesClient(object):
         """
         assert deployment_id
 
-        tempdir = tempfile.mkdtemp()
-        try:
-            tar_path = utils.tar_blueprint(blueprint_path, tempdir)
-            application_filename = os.path.basename(blueprint_path)
-
-            return self._update_from_archive(deployment_id,
-                                             tar_path,
-                                             application_filename,
-                                             inputs=inputs)
-        finally:
-            shutil.rmtree(tempdir)
+        data_form, params = self._update_from_archive(deployment_id,
+                                                      None,
+                                                      inputs=inputs)
+        params['application_file_name'] = \
+            urllib.quote(os.path.basename(blueprint_path))
+        # the blueprint is archived while being uploaded
+        app_name = os.path.basename(os.path.splitext(blueprint_path)[0])
+        data_form['blueprint_archive'] = (
+            '{0}.tar.gz'.format(app_name),
+            utils.tar_blueprint_stream(blueprint_path),
+            'application/x-tar')
+        return data_form, params
 
     @staticmethod
     def _update_from_archive(deployment_id,
@@ -131,6 +131,9 @@ class DeploymentUpdatesClient(object):
             params['application_file_name'] = \
                 urllib.quote(application_file_name)
 
+        if archive_path is None:
+            return data_form, params
+
         # For a Windows path (e.g. "C:\aaa\bbb.zip") scheme is the
         # drive letter and therefore the 2nd condition is present
         if all([urlparse.urlparse(archive_path).scheme,
@@ -190,7 +193,14 @@ class DeploymentUpdatesClient(object):
 
         data_and_headers = {}
 
-        if data_form:
+        if 'blueprint_archive' in data_form and \
+                not hasattr(data_form['blueprint_archive'][1], 'read'):
+            # the archive is streamed, its length is unknown
+            content_type, data = \
+                bytes_stream_utils.multipart_stream_gen(data_form)
+            data_and_headers['data'] = data
+            data_and_headers['headers'] = {'Content-type': content_type}
+        elif data_form:
             data = MultipartEncoder(fields=data_form)
             data_and_headers['data'] = data
             data_and_headers['headers'] = {'Content-type': data.content_type}
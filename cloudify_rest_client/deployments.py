@@ -13,13 +13,20 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
-from cloudify_rest_client.responses import ListResponse
+from cloudify_rest_client import utils
+from cloudify_rest_client.query import query_method
+from cloudify_rest_client.responses import ListResponse, lean_model
 
 
 class Deployment(dict):
     """
     Cloudify deployment.
     """
+    FIELDS = (
+        'id', 'blueprint_id', 'created_at', 'updated_at', 'workflows',
+        'inputs', 'outputs', 'policy_types', 'policy_triggers', 'groups',
+        'scaling_groups', 'description', 'permalink', 'created_by',
+        'tenant_name', 'private_resource')
 
     def __init__(self, deployment):
         super(Deployment, self).__init__()
@@ -106,6 +113,18 @@ class Workflow(dict):
         return self['parameters']
 
 
+def _wrap_workflows(workflows):
+    # might be None, for example in response for delete deployment
+    if not workflows:
+        return workflows
+    return [workflow if isinstance(workflow, Workflow) else Workflow(workflow)
+            for workflow in workflows]
+
+
+LeanDeployment = lean_model(Deployment,
+                            wrappers={'workflows': _wrap_workflows})
+
+
 class DeploymentOutputs(dict):
 
     def __init__(self, outputs):
@@ -146,7 +165,10 @@ class DeploymentsClient(object):
         self.api = api
         self.outputs = DeploymentOutputsClient(api)
 
-    def list(self, _include=None, sort=None, is_descending=False, **kwargs):
+    query = query_method(Deployment.FIELDS)
+
+    def list(self, _include=None, sort=None, is_descending=False,
+             lean=False, **kwargs):
         """
         Returns a list of all deployments.
 
@@ -155,6 +177,8 @@ class DeploymentsClient(object):
         :param is_descending: True for descending order, False for ascending.
         :param kwargs: Optional filter fields. for a list of available fields
                see the REST service's models.Deployment.fields
+        :param lean: Return memory-lean, read-only models instead of dicts
+                     (see `cloudify_rest_client.responses.LeanModel`).
         :return: Deployments list.
         """
         params = kwargs
@@ -165,9 +189,23 @@ class DeploymentsClient(object):
                                 _include=_include,
                                 params=params)
 
-        return ListResponse([Deployment(item) for item in response['items']],
+        model = LeanDeployment if lean else Deployment
+        return ListResponse([model(item) for item in response['items']],
                             response['metadata'])
 
+    def count(self, **kwargs):
+        """
+        Returns the number of deployments matching the filters of `list`.
+        """
+        return utils.count(self.list, 'id', **kwargs)
+
+    def count_by(self, field, values, **kwargs):
+        """
+        Returns the number of deployments per value of `field`, see
+        `cloudify_rest_client.utils.count_by`.
+        """
+        return utils.count_by(self.count, field, values, **kwargs)
+
     def get(self, deployment_id, _include=None):
         """
         Returns a deployment by its id.
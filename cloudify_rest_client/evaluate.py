@@ -13,6 +13,19 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
+import copy
+import json
+import time
+import hashlib
+import threading
+from collections import deque
+
+from cloudify_rest_client import utils
+
+MAX_MEMOIZED_EVALUATIONS = 1000
+# number of seconds a memoized evaluation is used for
+MEMO_TTL = 60
+
 
 class EvaluatedFunctions(dict):
     """
@@ -39,10 +52,21 @@ class EvaluatedFunctions(dict):
 
 class EvaluateClient(object):
 
-    def __init__(self, api):
+    def __init__(self, api, max_memoized=MAX_MEMOIZED_EVALUATIONS,
+                 memo_ttl=MEMO_TTL):
         self.api = api
+        self.max_memoized = max_memoized
+        self.memo_ttl = memo_ttl
+        self.hits = 0
+        self.misses = 0
+        # (deployment id, evaluation key) -> (memoized at, evaluated
+        # functions)
+        self._memo = {}
+        # memoized keys, oldest first
+        self._memo_order = deque()
+        self._lock = threading.Lock()
 
-    def functions(self, deployment_id, context, payload):
+    def functions(self, deployment_id, context, payload, use_cache=False):
         """Evaluate intrinsic functions in payload in respect to the
         provided context.
 
@@ -50,14 +74,150 @@ class EvaluateClient(object):
         :param context: The processing context
                         (dict with optional self, source, target).
         :param payload: The payload to process.
+        :param use_cache: Whether to memoize the evaluation. Memoized
+                          evaluations of a deployment are dropped when one
+                          of its node instances is updated through the
+                          same `CloudifyClient`, and are otherwise used
+                          for `memo_ttl` seconds; use `invalidate` when the
+                          deployment is known to have changed. At most
+                          `max_memoized` evaluations are kept.
         :return: The payload with its intrinsic functions references
                  evaluated.
         :rtype: EvaluatedFunctions
         """
         assert deployment_id
+        if not use_cache:
+            return self._evaluate(deployment_id, context, payload)
+        key = _evaluation_key(context, payload)
+        with self._lock:
+            result = self._lookup(deployment_id, key)
+        if result is None:
+            self.misses += 1
+            result = self._evaluate(deployment_id, context, payload)
+            with self._lock:
+                self._memoize(deployment_id, {key: result})
+        else:
+            self.hits += 1
+        return EvaluatedFunctions(copy.deepcopy(result))
+
+    def functions_many(self, deployment_id, evaluations,
+                       concurrency=utils.DEFAULT_CONCURRENCY,
+                       use_cache=False):
+        """Evaluate intrinsic functions in many payloads.
+
+        Payloads sharing the same context are evaluated together, in a
+        single request; requests of different contexts are sent
+        concurrently.
+
+        :param deployment_id: The deployment's id of the nodes.
+        :param evaluations: Iterable of (context, payload) tuples.
+        :param concurrency: Maximum number of concurrent requests.
+        :param use_cache: Whether to memoize the evaluations, see
+                          `functions`.
+        :return: List of `EvaluatedFunctions`, in the order of
+                 `evaluations`.
+        """
+        assert deployment_id
+        evaluations = list(evaluations)
+        keys = [_evaluation_key(context, payload)
+                for context, payload in evaluations]
+        results = {}
+        if use_cache:
+            with self._lock:
+                for key in keys:
+                    result = self._lookup(deployment_id, key)
+                    if result is not None:
+                        results[key] = result
+        # context key -> (context, {evaluation key: payload})
+        by_context = {}
+        for key, (context, payload) in zip(keys, evaluations):
+            if key in results:
+                continue
+            context_key = _evaluation_key(context, None)
+            by_context.setdefault(context_key, (context, {}))[1][key] = \
+                payload
+        hits = len(keys) - sum(len(payloads)
+                               for _, payloads in by_context.values())
+
+        def evaluate(context_payloads):
+            context, payloads = context_payloads
+            evaluated = self._evaluate(deployment_id, context, payloads)
+            return dict((key, EvaluatedFunctions({
+                'deployment_id': deployment_id,
+                'payload': value
+            })) for key, value in evaluated.payload.items())
+
+        evaluated = {}
+        for context_results in utils.run_concurrently(
+                evaluate, by_context.values(), concurrency):
+            evaluated.update(context_results)
+        results.update(evaluated)
+        if use_cache:
+            self.hits += hits
+            self.misses += len(keys) - hits
+            with self._lock:
+                self._memoize(deployment_id, evaluated)
+        return [EvaluatedFunctions(copy.deepcopy(results[key]))
+                for key in keys]
+
+    def invalidate(self, deployment_id=None):
+        """
+        Drops the memoized evaluations of a deployment, or of all the
+        deployments if no deployment id is provided.
+        """
+        with self._lock:
+            if deployment_id is None:
+                self._memo.clear()
+                self._memo_order.clear()
+            else:
+                self._forget(deployment_id)
+
+    def on_node_instance_update(self, node_instance):
+        """
+        Drops the memoized evaluations of the updated node instance's
+        deployment, whose runtime properties may have been used.
+        """
+        if node_instance.deployment_id is None:
+            self.invalidate()
+        else:
+            self.invalidate(node_instance.deployment_id)
+
+    def _lookup(self, deployment_id, key):
+        memoized = self._memo.get((deployment_id, key))
+        if memoized is None:
+            return None
+        memoized_at, result = memoized
+        if self.memo_ttl is not None and \
+                time.time() - memoized_at >= self.memo_ttl:
+            return None
+        return result
+
+    def _memoize(self, deployment_id, results):
+        now = time.time()
+        for key, result in results.items():
+            memo_key = (deployment_id, key)
+            if memo_key not in self._memo:
+                self._memo_order.append(memo_key)
+            self._memo[memo_key] = (now, result)
+        while len(self._memo_order) > self.max_memoized:
+            self._memo.pop(self._memo_order.popleft(), None)
+
+    def _forget(self, deployment_id):
+        self._memo_order = deque(memo_key for memo_key in self._memo_order
+                                 if memo_key[0] != deployment_id)
+        for memo_key in list(self._memo):
+            if memo_key[0] == deployment_id:
+                del self._memo[memo_key]
+
+    def _evaluate(self, deployment_id, context, payload):
         result = self.api.post('/evaluate/functions', data={
             'deployment_id': deployment_id,
             'context': context,
             'payload': payload
         })
         return EvaluatedFunctions(result)
+
+
+def _evaluation_key(context, payload):
+    serialized = json.dumps([context, payload], sort_keys=True)
+    return hashlib.sha1(serialized.encode('utf-8')).hexdigest()
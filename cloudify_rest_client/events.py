@@ -13,16 +13,55 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
+import os
+import gzip
+import json
+import time
+import threading
 import warnings
-from datetime import datetime
+from collections import deque
+from datetime import timedelta
+from multiprocessing.pool import ThreadPool
 
-from cloudify_rest_client.responses import ListResponse
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+import requests
+
+from cloudify_rest_client import utils
+from cloudify_rest_client.exceptions import CloudifyClientError
+from cloudify_rest_client.executions import Execution, ExecutionsClient
+from cloudify_rest_client.query import query_method, range_filter
+from cloudify_rest_client.responses import ListResponse, iter_pages
+
+EVENT_FIELDS = (
+    '@timestamp', 'timestamp', 'reported_timestamp', 'type', 'event_type',
+    'message', 'message_code', 'level', 'logger', 'context', 'blueprint_id',
+    'deployment_id', 'execution_id', 'workflow_id', 'node_name',
+    'node_instance_id', 'operation', 'error_causes', 'tenant_name')
+DEFAULT_BATCH_SIZE = 100
+MIN_POLL_INTERVAL = 0.5
+MAX_POLL_INTERVAL = 10
+DEDUPLICATION_WINDOW = 10000
+MAX_IDS_PER_QUERY = 100
+EXPORT_PAGE_SIZE = 1000
+EXPORT_QUEUED_PAGES = 2
+PURGE_WINDOW = timedelta(hours=1)
+SHARED_EVENT_FIELDS = frozenset([
+    'type', 'event_type', 'level', 'logger', 'blueprint_id',
+    'deployment_id', 'execution_id', 'workflow_id', 'node_name',
+    'node_instance_id', 'operation', 'plugin', 'task_name', 'task_target',
+    'tenant_name'])
+MAX_SHARED_STRINGS = 100000
 
 
 class EventsClient(object):
 
     def __init__(self, api):
         self.api = api
+        self._compactor = _EventCompactor()
 
     def get(self,
             execution_id,
@@ -52,8 +91,11 @@ class EventsClient(object):
         total_events = response.metadata.pagination.total
         return events, total_events
 
+    query = query_method(EVENT_FIELDS)
+
     def list(self, include_logs=False, message=None, from_datetime=None,
-             to_datetime=None, _include=None, sort=None, **kwargs):
+             to_datetime=None, _include=None, sort=None, compact=False,
+             **kwargs):
         """List events
 
         :param include_logs: Whether to also get logs.
@@ -63,6 +105,8 @@ class EventsClient(object):
         :param to_datetime: search for events earlier or equal to datetime
         :param _include: return only an exclusive list of fields
         :param sort: Key for sorting the list.
+        :param compact: Return memory-compact `EventRecord` items instead
+                        of dicts.
         :return: dict with 'metadata' and 'items' fields
         """
 
@@ -75,7 +119,303 @@ class EventsClient(object):
                                     **kwargs)
 
         response = self.api.get(uri, _include=_include, params=params)
-        return ListResponse(response['items'], response['metadata'])
+        items = response['items']
+        if compact:
+            items = [self._compactor.compact(item) for item in items]
+        return ListResponse(items, response['metadata'])
+
+    def count(self, **kwargs):
+        """
+        Returns the number of events matching the filters of `list`.
+        """
+        return utils.count(self.list, None, **kwargs)
+
+    def count_by(self, field, values, **kwargs):
+        """
+        Returns the number of events per value of `field`, see
+        `cloudify_rest_client.utils.count_by`.
+        """
+        return utils.count_by(self.count, field, values, **kwargs)
+
+    def follow(self, execution_id, include_logs=False, cursor='offset',
+               batch_size=DEFAULT_BATCH_SIZE, min_interval=MIN_POLL_INTERVAL,
+               max_interval=MAX_POLL_INTERVAL, timeout=None, compact=False):
+        """Follows the events of an execution as they arrive.
+
+        The events are polled, adapting the poll interval to the observed
+        event rate: polling is frequent during bursts and backs off while
+        the execution is idle. Following stops once the execution reaches
+        a terminal status and its remaining events were retrieved.
+
+        :param execution_id: Id of the execution to follow.
+        :param include_logs: Whether to also get logs.
+        :param cursor: How the position in the event stream is kept:
+                       'offset' (the number of events retrieved so far) or
+                       'timestamp' (the '@timestamp' of the latest event,
+                       which is robust against events being deleted).
+        :param batch_size: Maximum number of events to retrieve per call.
+        :param min_interval: Minimal time between polls, in seconds.
+        :param max_interval: Maximal time between polls, in seconds.
+        :param timeout: Optional time after which to stop following,
+                        in seconds.
+        :param compact: Yield memory-compact `EventRecord` items instead
+                        of dicts.
+        :return: Generator of events, in timestamp order.
+        """
+        poller = _EventsPoller(self,
+                               {'execution_id': execution_id},
+                               include_logs=include_logs,
+                               cursor=cursor,
+                               batch_size=batch_size,
+                               compact=compact)
+        return self._poll_adaptively(poller, execution_id,
+                                     min_interval=min_interval,
+                                     max_interval=max_interval,
+                                     timeout=timeout)
+
+    def _poll_adaptively(self, poller, execution_id=None,
+                         min_interval=MIN_POLL_INTERVAL,
+                         max_interval=MAX_POLL_INTERVAL, timeout=None):
+        # yields the events retrieved by the poller, adapting the poll
+        # interval to the event rate, until the execution (if any) ends
+        deadline = time.time() + timeout if timeout else None
+        interval = min_interval
+        rate = None
+        last_poll = None
+        finished = False
+        while True:
+            poll_time = time.time()
+            events = poller.poll()
+            for event in events:
+                yield event
+            if finished:
+                return
+            if events:
+                if last_poll is not None:
+                    elapsed = max(poll_time - last_poll, min_interval)
+                    current_rate = len(events) / elapsed
+                    rate = current_rate if rate is None \
+                        else (rate + current_rate) / 2
+                    # aim at about half a batch of events per poll
+                    interval = poller.batch_size / 2.0 / rate
+                else:
+                    interval = min_interval
+            else:
+                if execution_id is not None and \
+                        self._execution_ended(execution_id):
+                    # drain the events reported after the status change
+                    finished = True
+                    continue
+                interval *= 1.5
+            interval = min(max(interval, min_interval), max_interval)
+            last_poll = poll_time
+            if deadline is not None:
+                if time.time() + interval > deadline:
+                    return
+            time.sleep(interval)
+
+    def _execution_ended(self, execution_id):
+        execution = self.api.get('/executions/{0}'.format(execution_id),
+                                 _include=['status'])
+        return execution['status'] in Execution.END_STATES
+
+    def stream(self, execution_id=None, deployment_id=None, event_type=None,
+               include_logs=False, callback=None, transport=None,
+               compact=False):
+        """Streams events as they are reported.
+
+        By default, events are consumed from the manager's event stream
+        (`SSETransport`). When the manager doesn't offer one, events are
+        polled instead (`PollingTransport`). Either way, the events are
+        delivered the same way.
+
+        :param execution_id: Optional execution id to stream events of.
+                             The stream ends once the execution ended.
+        :param deployment_id: Optional deployment id to stream events of.
+        :param event_type: Optional event type to stream events of, e.g.
+                           'task_failed'.
+        :param include_logs: Whether to also get logs.
+        :param callback: Optional callable, called with each event. If not
+                         provided, the events are returned as a generator.
+        :param transport: Optional `EventTransport` to use, instead of
+                          the manager's event stream falling back to
+                          polling.
+        :param compact: Deliver memory-compact `EventRecord` items instead
+                        of dicts.
+        :return: Generator of events, or the number of events delivered
+                 if a callback was provided.
+        """
+        filters = {}
+        for field, value in (('execution_id', execution_id),
+                             ('deployment_id', deployment_id),
+                             ('event_type', event_type)):
+            if value is not None:
+                filters[field] = value
+        if transport is None:
+            events = self._stream_with_fallback(filters, include_logs)
+        else:
+            events = transport.events(self, filters, include_logs)
+        if compact:
+            events = (self._compactor.compact(event) for event in events)
+        if callback is None:
+            return events
+        delivered = 0
+        for event in events:
+            callback(event)
+            delivered += 1
+        return delivered
+
+    def _stream_with_fallback(self, filters, include_logs):
+        try:
+            for event in SSETransport().events(self, filters, include_logs):
+                yield event
+        except TransportUnavailable:
+            for event in PollingTransport().events(self, filters,
+                                                   include_logs):
+                yield event
+
+    def watcher(self, include_logs=False, poll_interval=1,
+                batch_size=1000, max_ids_per_query=MAX_IDS_PER_QUERY,
+                compact=False):
+        """Creates a watcher following the events of many executions at once.
+
+        :param include_logs: Whether to also get logs.
+        :param poll_interval: Time between poll rounds, in seconds.
+        :param batch_size: Maximum number of events to retrieve per call.
+        :param max_ids_per_query: Maximum number of execution ids filtered
+                                  by a single query.
+        :param compact: Deliver memory-compact `EventRecord` items instead
+                        of dicts.
+        :rtype: EventsWatcher
+        """
+        return EventsWatcher(self,
+                             include_logs=include_logs,
+                             poll_interval=poll_interval,
+                             batch_size=batch_size,
+                             max_ids_per_query=max_ids_per_query,
+                             compact=compact)
+
+    def export(self, output, from_datetime=None, to_datetime=None,
+               include_logs=False, slices=8, concurrency=4,
+               page_size=EXPORT_PAGE_SIZE, progress_callback=None,
+               checkpoint=None, **kwargs):
+        """Exports events to a gzip-compressed newline-delimited JSON file.
+
+        The time window is split into slices, using a '@timestamp' range
+        for each. Slices are retrieved concurrently but written in order,
+        so the output is in timestamp order. Each slice buffers at most a
+        few pages, which keeps memory use bounded.
+
+        :param output: Path of the output file, or a binary file-like
+                       object.
+        :param from_datetime: Start of the window (inclusive), a datetime
+                              or a timestamp string. Defaults to the
+                              earliest matching event.
+        :param to_datetime: End of the window (inclusive), a datetime or a
+                            timestamp string. Defaults to the latest
+                            matching event.
+        :param include_logs: Whether to also export logs.
+        :param slices: Number of sub-ranges the window is split into.
+        :param concurrency: Maximum number of slices retrieved at once.
+        :param page_size: Number of events to retrieve per call.
+        :param progress_callback: Called after each page with the number
+                                  of events written so far, the number of
+                                  completed slices and the total number
+                                  of slices.
+        :param checkpoint: Optional path of a checkpoint file, recording
+                           the completed slices. If the file exists, the
+                           export resumes after the last completed slice.
+                           Requires `output` to be a path. The file is
+                           removed once the export completes.
+        :param kwargs: Optional filter fields, e.g. deployment_id.
+        :return: The total number of events exported.
+        """
+        is_path = not hasattr(output, 'write')
+        if checkpoint and not is_path:
+            raise ValueError('A checkpoint requires the output to be a path')
+        saved_state = _read_checkpoint(checkpoint)
+        if saved_state:
+            from_datetime = from_datetime or saved_state['from_datetime']
+            to_datetime = to_datetime or saved_state['to_datetime']
+        from_datetime, to_datetime = self._time_bounds(
+            include_logs, from_datetime, to_datetime, kwargs)
+        if from_datetime is None or to_datetime is None:
+            # no matching events
+            ranges = []
+        else:
+            ranges = utils.split_time_range(from_datetime, to_datetime,
+                                            parts=slices)
+        state = {
+            'from_datetime': from_datetime and from_datetime.isoformat(),
+            'to_datetime': to_datetime and to_datetime.isoformat(),
+            'slices': len(ranges),
+            'completed': 0,
+            'offset': 0,
+            'events': 0
+        }
+        if saved_state:
+            for key in ('from_datetime', 'to_datetime', 'slices'):
+                if saved_state[key] != state[key]:
+                    raise ValueError(
+                        'Checkpoint {0} was created for a different export'
+                        .format(checkpoint))
+            state = saved_state
+
+        if is_path:
+            output_file = open(output, 'r+b' if state['completed'] else 'wb')
+            output_file.seek(state['offset'])
+            output_file.truncate()
+        else:
+            output_file = output
+        exporter = _EventsExporter(self, ranges[state['completed']:],
+                                   include_logs, page_size, kwargs)
+        written = 0
+        try:
+            for slice_pages in exporter.run(concurrency):
+                slice_file = gzip.GzipFile(fileobj=output_file, mode='wb')
+                for page in slice_pages:
+                    for event in page:
+                        slice_file.write(json.dumps(event).encode('utf-8'))
+                        slice_file.write(b'\n')
+                    written += len(page)
+                    if progress_callback:
+                        progress_callback(state['events'] + written,
+                                          state['completed'],
+                                          state['slices'])
+                # each slice is a complete gzip member, so the output can
+                # be truncated back to the last completed slice on resume
+                slice_file.close()
+                output_file.flush()
+                state['completed'] += 1
+                if checkpoint:
+                    state['offset'] = output_file.tell()
+                    state['events'] += written
+                    written = 0
+                    _write_json_atomically(checkpoint, state)
+                if progress_callback:
+                    progress_callback(state['events'] + written,
+                                      state['completed'],
+                                      state['slices'])
+        finally:
+            exporter.stop()
+            if output_file is not output:
+                output_file.close()
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        return state['events'] + written
+
+    def _time_bounds(self, include_logs, from_datetime, to_datetime,
+                     filters):
+        # missing bounds are those of the earliest and latest events
+        bounds = []
+        for value, sort in ((from_datetime, '@timestamp'),
+                            (to_datetime, '-@timestamp')):
+            if value is None:
+                page = self.list(include_logs=include_logs, sort=sort,
+                                 _size=1, **filters)
+                value = _event_timestamp(page[0]) if len(page) else None
+            bounds.append(utils.parse_timestamp(value))
+        return bounds
 
     def delete(self, deployment_id, include_logs=False, message=None,
                from_datetime=None, to_datetime=None, sort=None, **kwargs):
@@ -103,6 +443,97 @@ class EventsClient(object):
         response = self.api.delete(uri, params=params)
         return ListResponse(response['items'], response['metadata'])
 
+    def purge(self, deployment_id, from_datetime=None, to_datetime=None,
+              include_logs=False, window=PURGE_WINDOW, concurrency=2,
+              rate_limit=None, progress_callback=None, checkpoint=None,
+              **kwargs):
+        """Deletes the events of a deployment in batches.
+
+        Unlike `delete`, which deletes all the matching events with a
+        single request, the time range is split into windows (using a
+        '@timestamp' range for each), and the windows are deleted with
+        bounded concurrency and request rate, so that no single request
+        runs long or loads the manager's storage excessively.
+
+        :param deployment_id: The ID of the deployment.
+        :param from_datetime: Start of the range (inclusive), a datetime or
+                              a timestamp string. Defaults to the earliest
+                              matching event.
+        :param to_datetime: End of the range (inclusive), a datetime or a
+                            timestamp string. Defaults to the latest
+                            matching event.
+        :param include_logs: Whether to also delete logs.
+        :param window: Time span deleted by each request, a timedelta.
+        :param concurrency: Maximum number of concurrent delete requests.
+        :param rate_limit: Optional maximum number of delete requests per
+                           second.
+        :param progress_callback: Called after each window with the number
+                                  of events deleted so far, the number of
+                                  completed windows and the total number
+                                  of windows.
+        :param checkpoint: Optional path of a checkpoint file, recording
+                           the completed windows. If the file exists, the
+                           purge resumes with the remaining windows. The
+                           file is removed once the purge completes.
+        :param kwargs: Optional filter fields, as accepted by `delete`.
+        :return: The total number of deleted events.
+        """
+        assert deployment_id
+        kwargs['deployment_id'] = deployment_id
+        saved_state = _read_checkpoint(checkpoint)
+        if saved_state:
+            from_datetime = from_datetime or saved_state['from_datetime']
+            to_datetime = to_datetime or saved_state['to_datetime']
+        from_datetime, to_datetime = self._time_bounds(
+            include_logs, from_datetime, to_datetime, kwargs)
+        if from_datetime is None or to_datetime is None:
+            # no matching events
+            return 0
+        windows = utils.split_time_range(from_datetime, to_datetime,
+                                         step=window)
+        state = {
+            'from_datetime': from_datetime.isoformat(),
+            'to_datetime': to_datetime.isoformat(),
+            'windows': len(windows),
+            'completed': [],
+            'deleted': 0
+        }
+        if saved_state:
+            for key in ('from_datetime', 'to_datetime', 'windows'):
+                if saved_state[key] != state[key]:
+                    raise ValueError(
+                        'Checkpoint {0} was created for a different purge'
+                        .format(checkpoint))
+            state = saved_state
+        completed = set(state['completed'])
+        rate_limiter = utils.RateLimiter(rate_limit)
+        lock = threading.Lock()
+
+        def _purge_window(index):
+            window_from, window_to = windows[index]
+            rate_limiter.wait()
+            response = self.delete(from_datetime=window_from,
+                                   to_datetime=window_to,
+                                   include_logs=include_logs,
+                                   **kwargs)
+            with lock:
+                state['deleted'] += response.metadata.pagination.total
+                state['completed'].append(index)
+                if checkpoint:
+                    _write_json_atomically(checkpoint, state)
+                if progress_callback:
+                    progress_callback(state['deleted'],
+                                      len(state['completed']),
+                                      state['windows'])
+
+        utils.run_concurrently(
+            _purge_window,
+            [index for index in range(len(windows)) if index not in completed],
+            concurrency)
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        return state['deleted']
+
     @staticmethod
     def _create_query(include_logs=False, message=None, from_datetime=None,
                       to_datetime=None, sort=None, **kwargs):
@@ -114,25 +545,656 @@ class EventsClient(object):
         if include_logs:
             params['type'].append('cloudify_log')
 
-        timestamp_range = dict()
-
-        if from_datetime:
-            # if a datetime instance, convert to iso format
-            timestamp_range['from'] = \
-                from_datetime.isoformat() if isinstance(
-                    from_datetime, datetime) else from_datetime
-
-        if to_datetime:
-            timestamp_range['to'] = \
-                to_datetime.isoformat() if isinstance(
-                    to_datetime, datetime) else to_datetime
-
-        if timestamp_range:
+        if from_datetime or to_datetime:
             params['_range'] = params.get('_range', [])
-            params['_range'].append('@timestamp,{0},{1}'
-                                    .format(timestamp_range.get('from', ''),
-                                            timestamp_range.get('to', '')))
+            params['_range'].append(
+                range_filter('@timestamp', from_datetime, to_datetime))
         if sort:
             params['_sort'] = sort
 
         return params
+
+
+def _event_timestamp(event):
+    return event.get('@timestamp') or event.get('timestamp')
+
+
+def _later(timestamp, other):
+    if timestamp is None or (other is not None and other > timestamp):
+        return other
+    return timestamp
+
+
+def _event_key(event):
+    if isinstance(event, EventRecord):
+        event = event.to_dict()
+    return json.dumps(event, sort_keys=True)
+
+
+class _EventsPoller(object):
+    """
+    Retrieves the events matching a set of filters which were not
+    retrieved yet, keeping the position in the event stream between polls
+    either by offset or by '@timestamp' cursor.
+    """
+
+    def __init__(self, client, filters, include_logs=False, cursor='offset',
+                 batch_size=DEFAULT_BATCH_SIZE, from_datetime=None,
+                 compact=False):
+        if cursor not in ('offset', 'timestamp'):
+            raise ValueError("cursor must be either 'offset' or 'timestamp'")
+        self.client = client
+        self.filters = filters
+        self.include_logs = include_logs
+        self.cursor = cursor
+        self.batch_size = batch_size
+        self.compact = compact
+        self.offset = 0
+        self.timestamp = from_datetime
+        self._seen = _RecentKeys()
+
+    def poll(self):
+        """
+        :return: List of the new events, in timestamp order.
+        """
+        events = []
+        offset = self.offset if self.cursor == 'offset' else 0
+        while True:
+            page = self.client.list(include_logs=self.include_logs,
+                                    from_datetime=self.timestamp,
+                                    sort='@timestamp',
+                                    _offset=offset,
+                                    _size=self.batch_size,
+                                    compact=self.compact,
+                                    **self.filters)
+            offset += len(page)
+            events.extend(event for event in page
+                          if self._seen.add(_event_key(event)))
+            if len(page) < self.batch_size:
+                break
+        if self.cursor == 'offset':
+            self.offset = offset
+        elif events:
+            self.timestamp = _event_timestamp(events[-1]) or self.timestamp
+        return events
+
+
+class _RecentKeys(object):
+    """
+    Set of the most recently added keys, used for deduplicating events.
+    """
+
+    def __init__(self, size=DEDUPLICATION_WINDOW):
+        self.size = size
+        self._keys = set()
+        self._order = deque()
+
+    def add(self, key):
+        """
+        :return: True if the key is new, False if it was already added.
+        """
+        if key in self._keys:
+            return False
+        self._keys.add(key)
+        self._order.append(key)
+        if len(self._order) > self.size:
+            self._keys.discard(self._order.popleft())
+        return True
+
+
+class EventsWatcher(object):
+    """
+    Follows the events of many executions using shared poll rounds.
+
+    The registered executions are batched into combined queries filtering
+    by multiple execution ids, and the retrieved events are routed to
+    per-execution callbacks or queues. Executions are dropped once they
+    reach a terminal status and their remaining events were delivered.
+    The number of requests per round depends on the number of batches,
+    not on the number of executions.
+
+    Use `poll` to run a single round, `run` to poll until all the
+    executions finished, or `start` and `stop` to poll from a background
+    thread. When polling in the background, the last error raised by a
+    round is kept in `last_error`, and polling continues.
+
+    Executions which do not exist (e.g. were deleted) are dropped, and
+    their ids added to `not_found`; None is put on their queue, and their
+    `on_finish` callback is not called.
+    """
+
+    def __init__(self, client, include_logs=False, poll_interval=1,
+                 batch_size=1000, max_ids_per_query=MAX_IDS_PER_QUERY,
+                 compact=False):
+        self.client = client
+        self.include_logs = include_logs
+        self.compact = compact
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_ids_per_query = max_ids_per_query
+        self._executions = ExecutionsClient(client.api)
+        self._watched = {}
+        self._lock = threading.Lock()
+        self._seen = _RecentKeys(DEDUPLICATION_WINDOW * 10)
+        self._latest = None
+        self.not_found = []
+        self.last_error = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def register(self, execution_id, callback=None, on_finish=None):
+        """
+        Starts following the events of an execution.
+
+        :param execution_id: Id of the execution to follow.
+        :param callback: Called with each event of the execution. If not
+                         provided, the events are put on a queue instead.
+        :param on_finish: Optional callback, called with the execution
+                          once it finished and all its events were
+                          delivered.
+        :return: The queue of the execution's events if no callback was
+                 provided (None is put on it after the last event),
+                 otherwise None.
+        """
+        events_queue = None
+        if callback is None:
+            events_queue = queue.Queue()
+            callback = events_queue.put
+        with self._lock:
+            self._watched[execution_id] = _WatchedExecution(callback,
+                                                            on_finish,
+                                                            events_queue)
+        return events_queue
+
+    def unregister(self, execution_id):
+        """
+        Stops following the events of an execution.
+        """
+        with self._lock:
+            self._watched.pop(execution_id, None)
+
+    @property
+    def execution_ids(self):
+        """
+        :return: The ids of the executions currently followed.
+        """
+        with self._lock:
+            return list(self._watched)
+
+    def poll(self):
+        """
+        Runs a single poll round: retrieves the new events of all the
+        followed executions, routes them, and drops finished executions.
+
+        :return: The number of events delivered.
+        """
+        with self._lock:
+            watched = list(self._watched.items())
+        # new executions are batched apart, so that retrieving their whole
+        # history never rewinds the executions which were already polled;
+        # the others are batched by close cursors
+        new = [item for item in watched if not item[1].polled]
+        polled = sorted((item for item in watched if item[1].polled),
+                        key=lambda item: (item[1].timestamp is not None,
+                                          item[1].timestamp))
+        delivered = 0
+        for group in (new, polled):
+            for start in range(0, len(group), self.max_ids_per_query):
+                batch = dict(group[start:start + self.max_ids_per_query])
+                delivered += self._poll_batch(batch)
+                self._update_statuses(batch)
+        return delivered
+
+    def run(self):
+        """
+        Polls until all the followed executions finished, or until `stop`
+        is called.
+        """
+        while not self._stopped.is_set() and self.execution_ids:
+            self.poll()
+            self._stopped.wait(self.poll_interval)
+
+    def start(self):
+        """
+        Starts polling from a background thread. Unlike `run`, polling
+        continues when no execution is followed, until `stop` is called.
+        """
+        def _poll_until_stopped():
+            while not self._stopped.is_set():
+                try:
+                    self.poll()
+                except Exception as e:
+                    self.last_error = e
+                self._stopped.wait(self.poll_interval)
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=_poll_until_stopped)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops polling, waiting for the current round to end.
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _poll_batch(self, batch):
+        # executions without a cursor had no events so far, so they do not
+        # rewind the batch
+        timestamps = [watched.timestamp for watched in batch.values()
+                      if watched.timestamp is not None]
+        from_datetime = min(timestamps) if timestamps else None
+        latest = None
+        delivered = 0
+        offset = 0
+        while True:
+            page = self.client.list(include_logs=self.include_logs,
+                                    from_datetime=from_datetime,
+                                    sort='@timestamp',
+                                    _offset=offset,
+                                    _size=self.batch_size,
+                                    compact=self.compact,
+                                    execution_id=list(batch))
+            offset += len(page)
+            for event in page:
+                latest = _later(latest, _event_timestamp(event))
+                watched = batch.get(_event_execution_id(event))
+                if watched is None or not self._seen.add(_event_key(event)):
+                    continue
+                watched.callback(event)
+                delivered += 1
+            if len(page) < self.batch_size:
+                break
+        # all the events of the batch until the latest retrieved one were
+        # delivered, so the cursors of executions which had no new events
+        # move forward too, rather than rewinding the following rounds
+        self._latest = _later(self._latest, latest)
+        for watched in batch.values():
+            watched.polled = True
+            watched.timestamp = _later(watched.timestamp, latest) or \
+                self._latest
+        return delivered
+
+    def _update_statuses(self, batch):
+        for execution_id, watched in batch.items():
+            if watched.finished is not None:
+                # the events reported until the execution finished were
+                # retrieved in this round
+                self.unregister(execution_id)
+                if watched.queue is not None:
+                    watched.queue.put(None)
+                if watched.on_finish is not None:
+                    watched.on_finish(watched.finished)
+        pending = [execution_id for execution_id, watched in batch.items()
+                   if watched.finished is None]
+        if not pending:
+            return
+        executions = self._executions.list(id=pending,
+                                           include_system_workflows=True,
+                                           _include=['id', 'status'],
+                                           _size=len(pending))
+        found = set(execution.id for execution in executions)
+        for execution_id in pending:
+            if execution_id not in found:
+                self.unregister(execution_id)
+                self.not_found.append(execution_id)
+                if batch[execution_id].queue is not None:
+                    batch[execution_id].queue.put(None)
+        for execution in executions:
+            if execution.status in Execution.END_STATES:
+                batch[execution.id].finished = execution
+
+
+class _WatchedExecution(object):
+
+    def __init__(self, callback, on_finish=None, events_queue=None):
+        self.callback = callback
+        self.on_finish = on_finish
+        self.queue = events_queue
+        self.timestamp = None
+        self.polled = False
+        self.finished = None
+
+
+def _event_execution_id(event):
+    execution_id = event.get('execution_id')
+    if execution_id is None:
+        execution_id = (event.get('context') or {}).get('execution_id')
+    return execution_id
+
+
+class _EventsExporter(object):
+    """
+    Retrieves the events of consecutive time slices concurrently, while
+    yielding the slices in order. Each slice buffers a bounded number of
+    pages until it is consumed.
+    """
+
+    _END = object()
+
+    def __init__(self, client, ranges, include_logs, page_size, filters):
+        self.client = client
+        self.ranges = ranges
+        self.include_logs = include_logs
+        self.page_size = page_size
+        self.filters = filters
+        self._queues = [queue.Queue(EXPORT_QUEUED_PAGES) for _ in ranges]
+        self._stopped = threading.Event()
+        self._pool = None
+
+    def run(self, concurrency):
+        """
+        :return: Generator of slices, each a generator of event pages.
+        """
+        if not self.ranges:
+            return
+        self._pool = ThreadPool(max(1, min(concurrency, len(self.ranges))))
+        # the pool starts the slices in order, so the slice being
+        # consumed is always being retrieved
+        for index in range(len(self.ranges)):
+            self._pool.apply_async(self._retrieve, (index,))
+        for index in range(len(self.ranges)):
+            yield self._iter_slice(index)
+
+    def stop(self):
+        self._stopped.set()
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+
+    def _iter_slice(self, index):
+        slice_queue = self._queues[index]
+        while True:
+            page = slice_queue.get()
+            if page is self._END:
+                self._queues[index] = None
+                return
+            if isinstance(page, Exception):
+                raise page
+            yield page
+
+    def _retrieve(self, index):
+        from_datetime, to_datetime = self.ranges[index]
+        try:
+            for page in iter_pages(self.client.list,
+                                   self.page_size,
+                                   include_logs=self.include_logs,
+                                   from_datetime=from_datetime,
+                                   to_datetime=to_datetime,
+                                   sort='@timestamp',
+                                   **self.filters):
+                if len(page):
+                    self._put(index, page.items)
+            self._put(index, self._END)
+        except Exception as e:
+            self._put(index, e)
+
+    def _put(self, index, item):
+        while not self._stopped.is_set():
+            try:
+                self._queues[index].put(item, timeout=1)
+                return
+            except queue.Full:
+                pass
+
+
+def _read_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_json_atomically(path, data):
+    temp_path = '{0}.tmp'.format(path)
+    with open(temp_path, 'w') as f:
+        json.dump(data, f)
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(temp_path, path)
+
+
+class EventRecord(tuple):
+    """
+    Memory-compact, read-only event.
+
+    Events of the same shape share a single record type holding their
+    field names, so each record only holds its values. Fields are
+    accessed as attributes (``event.deployment_id``) or by key
+    (``event['@timestamp']``, ``event.get('node_name')``); nested dicts,
+    such as an event's context, are records as well. Like a dict, a record
+    iterates over and contains its field names. Use `to_dict` where an
+    actual dict is required.
+    """
+    __slots__ = ()
+    _fields = ()
+    _index = {}
+
+    def __getattr__(self, name):
+        try:
+            return tuple.__getitem__(self, self._index[name])
+        except KeyError:
+            raise AttributeError(name)
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, slice)):
+            return tuple.__getitem__(self, key)
+        return tuple.__getitem__(self, self._index[key])
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def get(self, key, default=None):
+        position = self._index.get(key)
+        if position is None:
+            return default
+        return tuple.__getitem__(self, position)
+
+    def keys(self):
+        return list(self._fields)
+
+    def values(self):
+        return list(tuple.__iter__(self))
+
+    def items(self):
+        return list(zip(self._fields, tuple.__iter__(self)))
+
+    def to_dict(self):
+        """
+        :return: The event as a dict, including its nested records.
+        """
+        return dict((key, value.to_dict()
+                     if isinstance(value, EventRecord) else value)
+                    for key, value in self.items())
+
+    def __repr__(self):
+        return 'EventRecord({0!r})'.format(self.to_dict())
+
+
+_record_types = {}
+
+
+def _record_type(fields):
+    record_type = _record_types.get(fields)
+    if record_type is None:
+        record_type = type('EventRecord', (EventRecord,), {
+            '__slots__': (),
+            '_fields': fields,
+            '_index': dict((field, position)
+                           for position, field in enumerate(fields))
+        })
+        record_type = _record_types.setdefault(fields, record_type)
+    return record_type
+
+
+class _EventCompactor(object):
+    """
+    Converts events into `EventRecord` items, storing repeated strings,
+    e.g. deployment ids or log levels, only once.
+    """
+
+    def __init__(self, max_shared_strings=MAX_SHARED_STRINGS):
+        self.max_shared_strings = max_shared_strings
+        self._strings = {}
+
+    def compact(self, value, field=None):
+        if isinstance(value, dict):
+            fields = tuple(sorted(value))
+            return _record_type(fields)(
+                self.compact(value[key], key) for key in fields)
+        if field in SHARED_EVENT_FIELDS and \
+                value.__class__ in (str, type(u'')):
+            if len(self._strings) >= self.max_shared_strings:
+                self._strings = {}
+            return self._strings.setdefault(value, value)
+        return value
+
+
+class TransportUnavailable(Exception):
+    """
+    Raised by an `EventTransport` when the manager doesn't support it.
+    """
+
+
+class EventTransport(object):
+    """
+    Base class of the transports delivering events to
+    `EventsClient.stream`.
+    """
+
+    def events(self, client, filters, include_logs):
+        """
+        :param client: The `EventsClient` to retrieve events with.
+        :param filters: dict of event filters (execution_id,
+                        deployment_id and event_type).
+        :param include_logs: Whether to also deliver logs.
+        :return: Generator of events. If 'execution_id' is filtered, the
+                 generator ends once the execution ended.
+        :raises TransportUnavailable: if the transport isn't supported by
+                                      the manager; raised before any event
+                                      is delivered.
+        """
+        raise NotImplementedError()
+
+
+class PollingTransport(EventTransport):
+    """
+    Delivers events by polling `EventsClient.list`, with an adaptive poll
+    interval.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE,
+                 min_interval=MIN_POLL_INTERVAL,
+                 max_interval=MAX_POLL_INTERVAL):
+        self.batch_size = batch_size
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+
+    def events(self, client, filters, include_logs):
+        poller = _EventsPoller(client, filters,
+                               include_logs=include_logs,
+                               cursor='timestamp',
+                               batch_size=self.batch_size)
+        return client._poll_adaptively(poller, filters.get('execution_id'),
+                                       min_interval=self.min_interval,
+                                       max_interval=self.max_interval)
+
+
+class SSETransport(EventTransport):
+    """
+    Delivers events from the manager's server-sent events stream.
+
+    Each message's data is a JSON event. If the connection drops, the
+    stream is reconnected, resuming after the last received message id.
+    """
+    uri = '/events/stream'
+    unavailable_status_codes = (404, 405, 406, 501)
+
+    def __init__(self, max_reconnects=5, reconnect_delay=1):
+        self.max_reconnects = max_reconnects
+        self.reconnect_delay = reconnect_delay
+
+    def events(self, client, filters, include_logs):
+        params = client._create_query(include_logs=include_logs, **filters)
+        execution_id = filters.get('execution_id')
+        last_event_id = None
+        connected = False
+        reconnects = 0
+        while True:
+            headers = {'Accept': 'text/event-stream'}
+            if last_event_id is not None:
+                headers['Last-Event-ID'] = last_event_id
+            try:
+                response = self._connect(client, params, headers, connected)
+                connected = True
+                try:
+                    for message_id, data in _parse_sse(
+                            response.live_lines_stream()):
+                        reconnects = 0
+                        if message_id is not None:
+                            last_event_id = message_id
+                        if data:
+                            yield json.loads(data)
+                finally:
+                    response.close()
+            except requests.exceptions.RequestException:
+                reconnects += 1
+                if not connected or reconnects > self.max_reconnects:
+                    raise
+                time.sleep(self.reconnect_delay)
+                continue
+            # the server closed the stream
+            if execution_id is None or \
+                    client._execution_ended(execution_id):
+                return
+
+    def _connect(self, client, params, headers, connected):
+        try:
+            response = client.api.get(self.uri, params=params,
+                                      headers=headers, stream=True)
+        except CloudifyClientError as e:
+            if not connected and \
+                    e.status_code in self.unavailable_status_codes:
+                raise TransportUnavailable(
+                    'Event stream not available: {0}'.format(e.status_code))
+            raise
+        content_type = response.headers.get('content-type', '')
+        if not content_type.startswith('text/event-stream'):
+            response.close()
+            message = 'Unexpected content type: {0}'.format(content_type)
+            if not connected:
+                raise TransportUnavailable(message)
+            raise CloudifyClientError(message)
+        return response
+
+
+def _parse_sse(lines):
+    # yields the (id, data) of the messages of a server-sent events stream
+    message_id = None
+    data = []
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if not line:
+            if data:
+                yield message_id, '\n'.join(data)
+            message_id = None
+            data = []
+            continue
+        if line.startswith(':'):
+            continue
+        field, _, value = line.partition(':')
+        if value.startswith(' '):
+            value = value[1:]
+        if field == 'data':
+            data.append(value)
+        elif field == 'id':
+            message_id = value
+    if data:
+        yield message_id, '\n'.join(data)
@@ -51,6 +51,16 @@ class DeploymentEnvironmentCreationPendingError(CloudifyClientError):
     ERROR_CODE = 'deployment_environment_creation_pending_error'
 
 
+class ExistingRunningExecutionError(CloudifyClientError):
+    """
+    Raised when there's attempt to execute a deployment workflow while
+    another execution of the deployment is running.
+    In such a case, workflow execution should be retried after the running
+    execution has ended, or forced.
+    """
+    ERROR_CODE = 'existing_running_execution_error'
+
+
 class IllegalExecutionParametersError(CloudifyClientError):
     """
     Raised when an attempt to execute a workflow with wrong/missing parameters
@@ -199,11 +209,21 @@ class DeploymentPluginNotFound(CloudifyClientError):
     ERROR_CODE = 'deployment_plugin_not_found'
 
 
+class ConflictError(CloudifyClientError):
+    """
+    Raised when an update conflicts with the stored resource, e.g. when
+    updating a node instance with an outdated version.
+    The client should get the resource again and retry the update.
+    """
+    ERROR_CODE = 'conflict_error'
+
+
 ERROR_MAPPING = dict([
     (error.ERROR_CODE, error)
     for error in [
         DeploymentEnvironmentCreationInProgressError,
         DeploymentEnvironmentCreationPendingError,
+        ExistingRunningExecutionError,
         IllegalExecutionParametersError,
         NoSuchIncludeFieldError,
         MissingRequiredDeploymentInputError,
@@ -221,4 +241,5 @@ ERROR_MAPPING = dict([
         PluginInstallationError,
         PluginInstallationTimeout,
         NotClusterMaster,
-        DeploymentPluginNotFound]])
+        DeploymentPluginNotFound,
+        ConflictError]])
@@ -13,7 +13,30 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
-from cloudify_rest_client.responses import ListResponse
+import time
+import threading
+from collections import deque
+
+from cloudify_rest_client import utils
+from cloudify_rest_client.exceptions import (
+    CloudifyClientError,
+    DeploymentEnvironmentCreationInProgressError,
+    DeploymentEnvironmentCreationPendingError,
+    ExistingRunningExecutionError)
+from cloudify_rest_client.query import query_method
+from cloudify_rest_client.responses import (ListResponse, iter_pages,
+                                            lean_model)
+
+
+# executions are polled by id in chunks, to keep the query string short
+MAX_IDS_PER_QUERY = 100
+MAX_POLL_INTERVAL = 30
+# seconds cancel_many waits for the cancelled executions to end
+DEFAULT_CANCEL_TIMEOUT = 300
+# errors upon which an execution start is retried later
+RETRIABLE_START_ERRORS = (DeploymentEnvironmentCreationInProgressError,
+                          DeploymentEnvironmentCreationPendingError,
+                          ExistingRunningExecutionError)
 
 
 class Execution(dict):
@@ -26,6 +49,10 @@ class Execution(dict):
     CANCELLING = 'cancelling'
     FORCE_CANCELLING = 'force_cancelling'
     END_STATES = [TERMINATED, FAILED, CANCELLED]
+    FIELDS = (
+        'id', 'deployment_id', 'blueprint_id', 'workflow_id', 'status',
+        'error', 'parameters', 'is_system_workflow', 'created_at',
+        'created_by', 'tenant_name', 'private_resource')
 
     def __init__(self, execution):
         self.update(execution)
@@ -95,13 +122,140 @@ class Execution(dict):
         return self.get('created_by')
 
 
+class BulkStartReport(dict):
+    """Report of `ExecutionsClient.start_many`."""
+
+    def __init__(self, report):
+        self.update(report)
+
+    @property
+    def executions(self):
+        """
+        :return: The started executions, in the order of the requested
+         starts; None for starts which failed.
+        """
+        return self.get('executions')
+
+    @property
+    def errors(self):
+        """
+        :return: The errors of the requested starts, in their order; None
+         for starts which succeeded.
+        """
+        return self.get('errors')
+
+    @property
+    def started(self):
+        """
+        :return: The number of started executions.
+        """
+        return self.get('started')
+
+    @property
+    def failed(self):
+        """
+        :return: The number of starts which failed.
+        """
+        return self.get('failed')
+
+    @property
+    def held_back(self):
+        """
+        :return: The number of starts which were held back at least once,
+         since their deployment was busy.
+        """
+        return self.get('held_back')
+
+    @property
+    def resubmitted(self):
+        """
+        :return: The total number of start resubmissions.
+        """
+        return self.get('resubmitted')
+
+    @property
+    def duration(self):
+        """
+        :return: The number of seconds it took to start the executions.
+        """
+        return self.get('duration')
+
+    @property
+    def throughput(self):
+        """
+        :return: The number of started executions per second.
+        """
+        return self.get('throughput')
+
+
+class BulkCancelReport(dict):
+    """Report of `ExecutionsClient.cancel_many`."""
+
+    def __init__(self, report):
+        self.update(report)
+
+    @property
+    def executions(self):
+        """
+        :return: dict mapping the id of each targeted execution to its last
+         polled state (id, status and error).
+        """
+        return self.get('executions')
+
+    @property
+    def errors(self):
+        """
+        :return: dict mapping execution ids to the error of their cancel
+         request, for requests which failed.
+        """
+        return self.get('errors')
+
+    @property
+    def cancelled(self):
+        """
+        :return: The number of executions which ended cancelled.
+        """
+        return self.get('cancelled')
+
+    @property
+    def escalated(self):
+        """
+        :return: The ids of the executions which were force-cancelled
+         after not ending in time.
+        """
+        return self.get('escalated')
+
+    @property
+    def pending(self):
+        """
+        :return: The ids of the executions which didn't end in time.
+        """
+        return self.get('pending')
+
+    @property
+    def duration(self):
+        """
+        :return: The number of seconds the cancellation took.
+        """
+        return self.get('duration')
+
+
+LeanExecution = lean_model(
+    Execution,
+    shared=['deployment_id', 'blueprint_id', 'workflow_id', 'status',
+            'created_by', 'tenant_name'])
+
+
 class ExecutionsClient(object):
 
     def __init__(self, api):
         self.api = api
 
+    query = query_method(Execution.FIELDS)
+
     def list(self, deployment_id=None, include_system_workflows=False,
-             _include=None, sort=None, is_descending=False, **kwargs):
+             _include=None, sort=None, is_descending=False,
+             lean=False, **kwargs):
         """Returns a list of executions.
 
         :param deployment_id: Optional deployment id to get executions for.
@@ -112,6 +266,8 @@ class ExecutionsClient(object):
         :param is_descending: True for descending order, False for ascending.
         :param kwargs: Optional filter fields. For a list of available fields
                see the REST service's models.Execution.fields
+        :param lean: Return memory-lean, read-only models instead of dicts
+                     (see `cloudify_rest_client.responses.LeanModel`).
         :return: Executions list.
         """
         uri = '/executions'
@@ -123,9 +279,23 @@ class ExecutionsClient(object):
             params['_sort'] = '-' + sort if is_descending else sort
 
         response = self.api.get(uri, params=params, _include=_include)
-        return ListResponse([Execution(item) for item in response['items']],
+        model = LeanExecution if lean else Execution
+        return ListResponse([model(item) for item in response['items']],
                             response['metadata'])
 
+    def count(self, **kwargs):
+        """
+        Returns the number of executions matching the filters of `list`.
+        """
+        return utils.count(self.list, 'id', **kwargs)
+
+    def count_by(self, field, values, **kwargs):
+        """
+        Returns the number of executions per value of `field`, see
+        `cloudify_rest_client.utils.count_by`.
+        """
+        return utils.count_by(self.count, field, values, **kwargs)
+
     def get(self, execution_id, _include=None):
         """Get execution by its id.
 
@@ -185,6 +355,98 @@ class ExecutionsClient(object):
                                  expected_status_code=201)
         return Execution(response)
 
+    def scheduler(self, max_deployments=utils.DEFAULT_CONCURRENCY,
+                  poll_interval=1, allow_custom_parameters=False):
+        """Returns a new `ExecutionScheduler` starting executions with this
+        client.
+
+        :param max_deployments: Maximum number of deployments executing at
+                                the same time.
+        :param poll_interval: Number of seconds between scheduling rounds.
+        :param allow_custom_parameters: See `start`.
+        """
+        return ExecutionScheduler(
+            self, max_deployments=max_deployments,
+            poll_interval=poll_interval,
+            allow_custom_parameters=allow_custom_parameters)
+
+    def start_many(self, executions, concurrency=utils.DEFAULT_CONCURRENCY,
+                   wait=False, timeout=None, retry_interval=5,
+                   retry_timeout=600, allow_custom_parameters=False,
+                   force=False):
+        """Starts workflow executions of many deployments.
+
+        Starts are requested concurrently. Deployments which can't execute
+        yet, since their environment is still being created or another of
+        their executions is running, are held back and resubmitted every
+        `retry_interval` seconds, until `retry_timeout` expires.
+
+        :param executions: Iterable of (deployment_id, workflow_id) or
+                           (deployment_id, workflow_id, parameters) tuples.
+        :param concurrency: Maximum number of concurrent start requests.
+        :param wait: Whether to wait for the started executions to end,
+                     updating their status and error in the report.
+        :param timeout: Number of seconds to wait for, if `wait` is set.
+        :param retry_interval: Number of seconds between resubmissions of
+                               held back starts.
+        :param retry_timeout: Number of seconds after which held back
+                              starts are failed.
+        :param allow_custom_parameters: See `start`.
+        :param force: See `start`.
+        :return: A `BulkStartReport`.
+        """
+        starts = [tuple(execution) + (None,) * (3 - len(execution))
+                  for execution in executions]
+        results = [None] * len(starts)
+        errors = [None] * len(starts)
+        held_back = set()
+        resubmitted = 0
+
+        def start(index):
+            deployment_id, workflow_id, parameters = starts[index]
+            try:
+                results[index] = self.start(
+                    deployment_id, workflow_id, parameters,
+                    allow_custom_parameters=allow_custom_parameters,
+                    force=force)
+                errors[index] = None
+            except Exception as e:
+                # e.g. connection errors, which only fail this start
+                errors[index] = e
+
+        started_at = time.time()
+        retry_deadline = started_at + retry_timeout
+        pending = list(range(len(starts)))
+        while True:
+            utils.run_concurrently(start, pending, concurrency)
+            pending = [index for index in pending
+                       if isinstance(errors[index], RETRIABLE_START_ERRORS)]
+            if not pending or time.time() + retry_interval > retry_deadline:
+                break
+            held_back.update(pending)
+            resubmitted += len(pending)
+            time.sleep(retry_interval)
+        duration = time.time() - started_at
+
+        if wait:
+            ended = self.wait([execution.id for execution in results
+                               if execution is not None], timeout=timeout)
+            for execution in results:
+                if execution is not None and ended.get(execution.id):
+                    execution.update(ended[execution.id])
+
+        started = sum(1 for error in errors if error is None)
+        return BulkStartReport({
+            'executions': results,
+            'errors': errors,
+            'started': started,
+            'failed': len(starts) - started,
+            'held_back': len(held_back),
+            'resubmitted': resubmitted,
+            'duration': duration,
+            'throughput': started / duration if duration else None
+        })
+
     def cancel(self, execution_id, force=False):
         """Cancels the execution which matches the provided execution id.
 
@@ -198,3 +460,474 @@ class ExecutionsClient(object):
                                  data={'action': action},
                                  expected_status_code=200)
         return Execution(response)
+
+    def cancel_many(self, execution_ids=None, force=False,
+                    escalate_after=None, timeout=DEFAULT_CANCEL_TIMEOUT,
+                    concurrency=utils.DEFAULT_CONCURRENCY, poll_interval=1,
+                    **kwargs):
+        """Cancels many executions, and confirms they ended.
+
+        The executions to cancel are either given by id, or selected by
+        filters, e.g. ``cancel_many(status=['started', 'pending'],
+        deployment_id=['dep1', 'dep2'])``. Cancel requests are sent
+        concurrently, then the executions are polled in batches until they
+        end. Executions which haven't ended `escalate_after` seconds after
+        being cancelled are force-cancelled.
+
+        :param execution_ids: Ids of the executions to cancel.
+        :param force: Whether to force-cancel the executions right away.
+        :param escalate_after: Optional number of seconds after which
+                               executions which haven't ended are
+                               force-cancelled.
+        :param timeout: Number of seconds to wait for the executions to
+                        end, after the last cancel requests, or None to
+                        wait until they all end. Executions whose cancel
+                        request failed are not waited for.
+        :param concurrency: Maximum number of concurrent cancel requests.
+        :param poll_interval: Initial number of seconds between polls.
+        :param kwargs: Filter fields selecting the executions to cancel,
+                       as accepted by `list`, if `execution_ids` is not
+                       provided. Executions which already ended are
+                       skipped.
+        :return: A `BulkCancelReport`.
+        """
+        started_at = time.time()
+        if execution_ids is None:
+            if not kwargs:
+                raise ValueError('Either execution ids or filters must be '
+                                 'provided')
+            kwargs.setdefault('include_system_workflows', True)
+            execution_ids = [execution.id
+                             for page in iter_pages(self.list,
+                                                    _include=['id', 'status'],
+                                                    **kwargs)
+                             for execution in page
+                             if execution.status not in Execution.END_STATES]
+        execution_ids = list(execution_ids)
+        errors = {}
+
+        def cancel_all(ids, force_cancel):
+            def cancel(execution_id):
+                try:
+                    self.cancel(execution_id, force=force_cancel)
+                except Exception as e:
+                    errors[execution_id] = e
+            utils.run_concurrently(cancel, ids, concurrency)
+
+        def not_ended():
+            # executions whose cancel request failed won't end because of it
+            return [execution_id
+                    for execution_id, execution in executions.items()
+                    if execution_id not in errors and
+                    (execution is None or
+                     execution.status not in Execution.END_STATES)]
+
+        def wait_for(ids, wait_timeout):
+            for execution_id, execution in self.wait(
+                    ids, timeout=wait_timeout,
+                    poll_interval=poll_interval).items():
+                if execution is not None:
+                    executions[execution_id] = execution
+
+        executions = dict((execution_id, None)
+                          for execution_id in execution_ids)
+        cancel_all(execution_ids, force)
+        escalated = []
+        if escalate_after is not None and not force:
+            wait_for(not_ended(), escalate_after)
+            escalated = not_ended()
+            cancel_all(escalated, True)
+        pending = not_ended()
+        if pending:
+            wait_for(pending, timeout)
+            pending = not_ended()
+        return BulkCancelReport({
+            'executions': executions,
+            'errors': errors,
+            'cancelled': sum(1 for execution in executions.values()
+                             if execution is not None and
+                             execution.status == Execution.CANCELLED),
+            'escalated': escalated,
+            'pending': pending,
+            'duration': time.time() - started_at
+        })
+
+    def iter_completed(self, execution_ids, timeout=None, poll_interval=1,
+                       max_poll_interval=MAX_POLL_INTERVAL):
+        """Yields executions as they end, in the order in which they ended.
+
+        All pending executions are polled with a single `list` request per
+        poll (per `MAX_IDS_PER_QUERY` executions), retrieving only their
+        id, status and error. The poll interval grows as the executions
+        age, from `poll_interval` up to `max_poll_interval`.
+
+        :param execution_ids: Ids of the executions to wait for.
+        :param timeout: Optional number of seconds to wait for. When it
+                        expires, iteration stops even though some
+                        executions haven't ended. Executions which are not
+                        found are skipped.
+        :param poll_interval: Initial number of seconds between polls.
+        :param max_poll_interval: Maximum number of seconds between polls.
+        :return: Generator of ended executions (id, status and error).
+        """
+        for execution in self._iter_statuses(
+                execution_ids, timeout, poll_interval, max_poll_interval):
+            if execution.status in Execution.END_STATES:
+                yield execution
+
+    def wait(self, execution_ids, timeout=None, poll_interval=1,
+             max_poll_interval=MAX_POLL_INTERVAL):
+        """Waits for executions to end.
+
+        :param execution_ids: Ids of the executions to wait for.
+        :param timeout: Optional number of seconds to wait for.
+        :param poll_interval: Initial number of seconds between polls.
+        :param max_poll_interval: Maximum number of seconds between polls.
+        :return: dict mapping each execution id to the execution (id,
+                 status and error). On timeout, executions which haven't
+                 ended are mapped to their last polled state. Ids of
+                 executions which were not found are mapped to None, and
+                 not waited for.
+        """
+        executions = dict((execution_id, None)
+                          for execution_id in execution_ids)
+        not_found = []
+        for execution in self._iter_statuses(
+                execution_ids, timeout, poll_interval, max_poll_interval,
+                not_found=not_found):
+            executions[execution.id] = execution
+        for execution_id in not_found:
+            executions[execution_id] = None
+        return executions
+
+    def wait_any(self, execution_ids, timeout=None, poll_interval=1,
+                 max_poll_interval=MAX_POLL_INTERVAL):
+        """Waits for any of the executions to end.
+
+        :param execution_ids: Ids of the executions to wait for.
+        :param timeout: Optional number of seconds to wait for.
+        :param poll_interval: Initial number of seconds between polls.
+        :param max_poll_interval: Maximum number of seconds between polls.
+        :return: The first execution to end (id, status and error), or
+                 None on timeout or if none of the executions was found.
+        """
+        for execution in self.iter_completed(
+                execution_ids, timeout, poll_interval, max_poll_interval):
+            return execution
+        return None
+
+    def _iter_statuses(self, execution_ids, timeout, poll_interval,
+                       max_poll_interval, not_found=None):
+        # yields every change of status of the executions, until they all
+        # ended or the timeout expired. Executions missing from a poll
+        # (e.g. never existed or deleted) are dropped, and their ids added
+        # to `not_found`
+        pending = dict((execution_id, None)
+                       for execution_id in execution_ids)
+        started_at = time.time()
+        deadline = None
+        if timeout is not None:
+            # a timeout of 0 polls once
+            deadline = started_at + timeout
+        while pending:
+            executions = self._get_statuses(list(pending))
+            found = set(execution.id for execution in executions)
+            for execution_id in list(pending):
+                if execution_id not in found:
+                    del pending[execution_id]
+                    if not_found is not None:
+                        not_found.append(execution_id)
+            for execution in executions:
+                if execution.id not in pending:
+                    continue
+                last_status = pending.get(execution.id)
+                if execution.status == last_status:
+                    continue
+                if execution.status in Execution.END_STATES:
+                    del pending[execution.id]
+                else:
+                    pending[execution.id] = execution.status
+                yield execution
+            if not pending:
+                return
+            # poll less often the longer the executions run, at about a
+            # tenth of their running time
+            elapsed = time.time() - started_at
+            interval = min(max(poll_interval, elapsed / 10.0),
+                           max_poll_interval)
+            if deadline is not None:
+                interval = min(interval, deadline - time.time())
+                if interval <= 0:
+                    return
+            time.sleep(interval)
+
+    def _get_statuses(self, execution_ids):
+        executions = []
+        for i in range(0, len(execution_ids), MAX_IDS_PER_QUERY):
+            chunk = execution_ids[i:i + MAX_IDS_PER_QUERY]
+            executions.extend(self.list(id=chunk,
+                                        include_system_workflows=True,
+                                        _include=['id', 'status', 'error'],
+                                        _size=len(chunk)))
+        return executions
+
+
+class ScheduledExecution(object):
+    """An execution request submitted to an `ExecutionScheduler`."""
+
+    def __init__(self, deployment_id, workflow_id, parameters=None):
+        self.deployment_id = deployment_id
+        self.workflow_id = workflow_id
+        self.parameters = parameters
+        self.queued_at = time.time()
+        self.started_at = None
+        self.ended_at = None
+        self.execution = None
+        self.error = None
+        self._done = threading.Event()
+
+    @property
+    def status(self):
+        """
+        :return: 'queued', 'failed' if the execution couldn't be started
+         or was deleted, otherwise the last polled status of the execution.
+        """
+        if self.error is not None:
+            return 'failed'
+        if self.execution is None:
+            return 'queued'
+        return self.execution.status
+
+    @property
+    def done(self):
+        """
+        :return: True if the execution ended or couldn't be started.
+        """
+        return self._done.is_set()
+
+    @property
+    def wait_time(self):
+        """
+        :return: The number of seconds the request was (or has been so far)
+         queued for.
+        """
+        return (self.started_at or time.time()) - self.queued_at
+
+    def wait(self, timeout=None):
+        """
+        Waits for the execution to end, or to fail starting.
+
+        :param timeout: Optional number of seconds to wait for.
+        :return: True if it ended, False on timeout.
+        """
+        return self._done.wait(timeout)
+
+    def _end(self):
+        self.ended_at = time.time()
+        self._done.set()
+
+
+class ExecutionScheduler(object):
+    """
+    Client-side queue of executions, which runs one execution at a time
+    per deployment.
+
+    Each deployment has a FIFO of submitted executions. Up to
+    `max_deployments` deployments execute at the same time, the one that
+    has waited the longest being started first. Running executions are
+    polled with a single `list` request per round (per
+    `MAX_IDS_PER_QUERY` executions). Starts rejected since the deployment
+    is busy (e.g. an execution started by someone else is running) are
+    retried on the next rounds.
+
+    Use `poll` to run a single scheduling round, `run` to schedule until
+    all the submitted executions ended, or `start` and `stop` to schedule
+    from a background thread. A background round which fails, e.g. since
+    the manager is unreachable, is retried on the next interval; its error
+    is kept in `last_error`.
+    """
+
+    def __init__(self, client, max_deployments=utils.DEFAULT_CONCURRENCY,
+                 poll_interval=1, allow_custom_parameters=False):
+        self.client = client
+        self.max_deployments = max_deployments
+        self.poll_interval = poll_interval
+        self.allow_custom_parameters = allow_custom_parameters
+        self._queues = {}
+        self._running = {}
+        self._completed = 0
+        self._failed = 0
+        self._total_wait_time = 0
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def submit(self, deployment_id, workflow_id, parameters=None):
+        """
+        Queues an execution of a deployment's workflow.
+
+        :param deployment_id: The deployment's id to execute a workflow for.
+        :param workflow_id: The workflow to be executed id.
+        :param parameters: Parameters for the workflow execution.
+        :return: A `ScheduledExecution`, updated as the execution is
+                 started and ends.
+        """
+        scheduled = ScheduledExecution(deployment_id, workflow_id,
+                                       parameters)
+        with self._lock:
+            self._queues.setdefault(deployment_id, deque()).append(scheduled)
+        return scheduled
+
+    @property
+    def pending(self):
+        """
+        :return: The number of submitted executions which haven't ended.
+        """
+        with self._lock:
+            return len(self._running) + sum(
+                len(scheduled) for scheduled in self._queues.values())
+
+    def metrics(self):
+        """
+        :return: dict of scheduling metrics: the number of queued, running,
+         completed and failed executions, the average wait time of the
+         started executions, and per-deployment queue metrics (`queues`,
+         mapping deployment ids to their queue depth, whether they are
+         running an execution and the wait time of their oldest request).
+        """
+        now = time.time()
+        with self._lock:
+            queues = {}
+            for deployment_id, scheduled in self._queues.items():
+                queues[deployment_id] = {
+                    'depth': len(scheduled),
+                    'running': deployment_id in self._running,
+                    'oldest_wait_time': now - scheduled[0].queued_at
+                }
+            started = self._completed + len(self._running)
+            return {
+                'queued': sum(len(scheduled)
+                              for scheduled in self._queues.values()),
+                'running': len(self._running),
+                'completed': self._completed,
+                'failed': self._failed,
+                'average_wait_time':
+                    self._total_wait_time / started if started else None,
+                'queues': queues
+            }
+
+    def poll(self):
+        """
+        Runs a single scheduling round: updates the statuses of the
+        running executions, then starts the next queued executions of idle
+        deployments.
+
+        :return: The number of executions started.
+        """
+        self._update_running()
+        with self._lock:
+            idle = [deployment_id for deployment_id in self._queues
+                    if deployment_id not in self._running]
+            free = self.max_deployments - len(self._running)
+            # deployments which waited the longest go first
+            idle.sort(key=lambda deployment_id:
+                      self._queues[deployment_id][0].queued_at)
+            to_start = [self._queues[deployment_id][0]
+                        for deployment_id in idle[:max(free, 0)]]
+        started = utils.run_concurrently(self._start, to_start,
+                                         self.max_deployments)
+        return started.count(True)
+
+    def run(self):
+        """
+        Schedules until all the submitted executions ended, or until
+        `stop` is called.
+        """
+        while not self._stopped.is_set() and self.pending:
+            self.poll()
+            self._stopped.wait(self.poll_interval)
+
+    def start(self):
+        """
+        Starts scheduling from a background thread. Unlike `run`,
+        scheduling continues when no execution is pending, until `stop` is
+        called.
+        """
+        def _poll_until_stopped():
+            while not self._stopped.is_set():
+                try:
+                    self.poll()
+                except Exception as e:
+                    self.last_error = e
+                self._stopped.wait(self.poll_interval)
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=_poll_until_stopped)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops scheduling, waiting for the current round to end. Running
+        executions are not cancelled.
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _start(self, scheduled):
+        try:
+            execution = self.client.start(
+                scheduled.deployment_id, scheduled.workflow_id,
+                scheduled.parameters,
+                allow_custom_parameters=self.allow_custom_parameters)
+        except RETRIABLE_START_ERRORS:
+            # the deployment is busy, retry on the next round
+            return False
+        except Exception as e:
+            scheduled.error = e
+            with self._lock:
+                self._dequeue(scheduled)
+                self._failed += 1
+            scheduled._end()
+            return False
+        scheduled.execution = execution
+        scheduled.started_at = time.time()
+        with self._lock:
+            self._dequeue(scheduled)
+            self._running[scheduled.deployment_id] = scheduled
+            self._total_wait_time += scheduled.wait_time
+        return True
+
+    def _dequeue(self, scheduled):
+        scheduled_queue = self._queues[scheduled.deployment_id]
+        scheduled_queue.popleft()
+        if not scheduled_queue:
+            del self._queues[scheduled.deployment_id]
+
+    def _update_running(self):
+        with self._lock:
+            running = dict((scheduled.execution.id, scheduled)
+                           for scheduled in self._running.values())
+        if not running:
+            return
+        for execution in self.client._get_statuses(list(running)):
+            scheduled = running.pop(execution.id)
+            scheduled.execution.update(execution)
+            if execution.status not in Execution.END_STATES:
+                continue
+            with self._lock:
+                del self._running[scheduled.deployment_id]
+                self._completed += 1
+            scheduled._end()
+        # executions which were not listed were deleted
+        for execution_id, scheduled in running.items():
+            scheduled.error = CloudifyClientError(
+                'Execution {0} was not found'.format(execution_id),
+                status_code=404, error_code='not_found_error')
+            with self._lock:
+                del self._running[scheduled.deployment_id]
+                self._failed += 1
+            scheduled._end()
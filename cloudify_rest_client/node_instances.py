@@ -12,15 +12,35 @@
 #    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
+import copy
+import time
+import random
+import logging
+import weakref
+import threading
 import warnings
 
-from cloudify_rest_client.responses import ListResponse
+from cloudify_rest_client import utils
+from cloudify_rest_client.exceptions import CloudifyClientError, ConflictError
+from cloudify_rest_client.query import query_method
+from cloudify_rest_client.responses import (DEFAULT_PAGE_SIZE, ListResponse,
+                                            iter_pages, lean_model,
+                                            list_in_chunks)
+
+# node instances are fetched by id in chunks, to keep the query string short
+MAX_IDS_PER_QUERY = 100
+
+logger = logging.getLogger('cloudify.rest_client.node_instances')
 
 
 class NodeInstance(dict):
     """
     Cloudify node instance.
     """
+    FIELDS = (
+        'id', 'node_id', 'deployment_id', 'host_id', 'relationships',
+        'runtime_properties', 'scaling_groups', 'state', 'version',
+        'created_by', 'tenant_name')
 
     @property
     def id(self):
@@ -94,10 +114,54 @@ class NodeInstance(dict):
         return self.get('scaling_groups', [])
 
 
+class NodeInstancesDelta(dict):
+    """
+    Node instances which changed between two `NodeInstancesSync.sync`
+    calls.
+    """
+
+    def __init__(self, delta):
+        self.update(delta)
+
+    @property
+    def added(self):
+        """
+        :return: The node instances which were added.
+        """
+        return self.get('added')
+
+    @property
+    def changed(self):
+        """
+        :return: The node instances whose version changed.
+        """
+        return self.get('changed')
+
+    @property
+    def removed(self):
+        """
+        :return: The ids of the node instances which were removed.
+        """
+        return self.get('removed')
+
+
+LeanNodeInstance = lean_model(
+    NodeInstance,
+    shared=['node_id', 'deployment_id', 'state', 'created_by', 'tenant_name'])
+
+
 class NodeInstancesClient(object):
 
     def __init__(self, api):
         self.api = api
+        self.merge_metrics = {
+            'updates': 0,
+            'conflicts': 0,
+            'failures': 0,
+            'max_attempts': 0
+        }
+        self._metrics_lock = threading.Lock()
+        self._update_listeners = []
 
     @staticmethod
     def _get_node_instance_uri(node_instance_id):
@@ -141,26 +205,169 @@ class NodeInstancesClient(object):
         if state is not None:
             data['state'] = state
         response = self.api.patch(uri, data=data)
-        return NodeInstance(response)
+        node_instance = NodeInstance(response)
+        for listener in list(self._update_listeners):
+            try:
+                listener(node_instance)
+            except Exception:
+                # the update was already stored
+                logger.exception('Update listener failed for node '
+                                 'instance %s', node_instance_id)
+        return node_instance
+
+    def add_update_listener(self, listener):
+        """
+        Registers a callable, called with each node instance updated
+        through this client. Exceptions raised by the listener are logged,
+        and don't fail the update.
+        """
+        self._update_listeners.append(listener)
+
+    def remove_update_listener(self, listener):
+        """
+        Unregisters a callable registered by `add_update_listener`.
+        """
+        if listener in self._update_listeners:
+            self._update_listeners.remove(listener)
+
+    def sync(self, listener=None, page_size=DEFAULT_PAGE_SIZE, **kwargs):
+        """
+        Returns a new `NodeInstancesSync`, retrieving the node instances
+        matching the provided filters which changed since the last sync.
+
+        :param listener: Optional callable, called with ('added',
+                         node_instance), ('changed', node_instance) and
+                         ('removed', node_instance_id) on each sync.
+        :param page_size: Number of node instances to retrieve per request.
+        :param kwargs: Optional filter fields, as accepted by `list`, e.g.
+                       deployment_id, and `_include`.
+        """
+        return NodeInstancesSync(self, listener=listener,
+                                 page_size=page_size, **kwargs)
+
+    def cache(self, deployment_id=None):
+        """
+        Returns a new read-through `NodeInstanceCache`, kept up to date
+        with the updates made through this client.
+
+        :param deployment_id: Optional deployment id whose node instances
+                              are cached by `NodeInstanceCache.warm_up`.
+        """
+        return NodeInstanceCache(self, deployment_id=deployment_id)
+
+    def update_with_merge(self, node_instance_id, mutator, state=None,
+                          max_retries=10, backoff=0.1, max_backoff=5):
+        """
+        Updates the runtime properties of a node instance using a function,
+        retrying on version conflicts with other writers.
+
+        The node instance is retrieved, `mutator` is applied to its runtime
+        properties, and the node instance is updated with the retrieved
+        version. On a version conflict, this is repeated after a randomized
+        exponential backoff, so the changes of the other writers are kept.
+        Contention is counted in `merge_metrics`.
+
+        :param node_instance_id: The identifier of the node instance to
+                                 update.
+        :param mutator: Callable receiving the current runtime properties,
+                        which either changes them in place or returns the
+                        updated runtime properties. It may be called more
+                        than once.
+        :param state: Optional updated state.
+        :param max_retries: Maximum number of retries on conflicts.
+        :param backoff: Initial backoff, in seconds.
+        :param max_backoff: Maximum backoff, in seconds.
+        :raises ConflictError: if the update still conflicted after
+                               `max_retries` retries.
+        :return: The updated node instance.
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            node_instance = self.get(
+                node_instance_id,
+                _include=['id', 'runtime_properties', 'version'])
+            runtime_properties = node_instance.runtime_properties or {}
+            updated = mutator(runtime_properties)
+            if updated is None:
+                updated = runtime_properties
+            try:
+                result = self.update(node_instance_id, state=state,
+                                     runtime_properties=updated,
+                                     version=node_instance.version)
+            except CloudifyClientError as e:
+                if not isinstance(e, ConflictError) and e.status_code != 409:
+                    raise
+                self._count_merge(attempt, conflict=True,
+                                  failed=attempt > max_retries)
+                if attempt > max_retries:
+                    raise
+                # full jitter, so that competing writers spread out
+                time.sleep(random.uniform(
+                    0, min(max_backoff, backoff * 2 ** (attempt - 1))))
+                continue
+            self._count_merge(attempt)
+            return result
+
+    def _count_merge(self, attempt, conflict=False, failed=False):
+        with self._metrics_lock:
+            metrics = self.merge_metrics
+            if conflict:
+                metrics['conflicts'] += 1
+            else:
+                metrics['updates'] += 1
+            if failed:
+                metrics['failures'] += 1
+            metrics['max_attempts'] = max(metrics['max_attempts'], attempt)
+
+    def update_buffer(self, flush_interval=1, max_pending=100):
+        """
+        Returns a new write-behind `NodeInstanceUpdateBuffer` updating node
+        instances with this client.
+
+        :param flush_interval: Number of seconds after which buffered
+                               updates are flushed, or None to only flush
+                               on size or explicitly.
+        :param max_pending: Number of buffered node instances upon which
+                            updates are flushed.
+        """
+        return NodeInstanceUpdateBuffer(self, flush_interval=flush_interval,
+                                        max_pending=max_pending)
+
+    query = query_method(NodeInstance.FIELDS)
 
     def list(self, deployment_id=None, node_name=None, node_id=None,
-             _include=None, sort=None, is_descending=False, **kwargs):
+             _include=None, sort=None, is_descending=False,
+             lean=False, concurrency=utils.DEFAULT_CONCURRENCY, **kwargs):
         """
         Returns a list of node instances which belong to the deployment
         identified by the provided deployment id.
 
-        :param deployment_id: Optional deployment id to list node instances
-                              for.
+        `deployment_id` and `node_id` may also be lists of ids, e.g. of
+        thousands of deployments. The ids are then split into chunks which
+        fit in a request's url, and all the matching node instances are
+        retrieved, paging through the chunks concurrently. `_offset` and
+        `_size` then apply to the merged node instances, in the order of
+        the chunks (see `cloudify_rest_client.responses.list_in_chunks`).
+        Use ``group_by('deployment_id')`` on the result to group them by
+        deployment.
+
+        :param deployment_id: Optional deployment id, or list of ids, to
+                              list node instances for.
         :param node_name: Optional node name to only fetch node instances with
                           this name. The node_name positional argument will be
                           deprecated as of the next rest-client version.
                           Use node_id instead.
-        :param node_id: Equivalent to node_name.
+        :param node_id: Equivalent to node_name. May be a list of node ids.
         :param _include: List of fields to include in response.
         :param sort: Key for sorting the list.
         :param is_descending: True for descending order, False for ascending.
         :param kwargs: Optional filter fields. for a list of available fields
                see the REST service's models.DeploymentNodeInstance.fields
+        :param lean: Return memory-lean, read-only models instead of dicts
+                     (see `cloudify_rest_client.responses.LeanModel`).
+        :param concurrency: Maximum number of concurrent requests, when
+                            listing by lists of ids.
         :return: Node instances.
         :rtype: list
         """
@@ -178,9 +385,447 @@ class NodeInstancesClient(object):
         if sort:
             params['_sort'] = '-' + sort if is_descending else sort
 
+        model = LeanNodeInstance if lean else NodeInstance
+        for field in ('deployment_id', 'node_id'):
+            if isinstance(params.get(field), (list, tuple, set, frozenset)):
+                values = list(params.pop(field))
+                return list_in_chunks(
+                    lambda **chunk_params: self._list(chunk_params, _include,
+                                                      model),
+                    field, values, concurrency=concurrency,
+                    offset=params.pop('_offset', 0),
+                    size=params.pop('_size', None), **params)
+        return self._list(params, _include, model)
+
+    def _list(self, params, _include, model):
         response = self.api.get('/node-instances',
                                 params=params,
                                 _include=_include)
-
-        return ListResponse([NodeInstance(item) for item in response['items']],
+        return ListResponse([model(item) for item in response['items']],
                             response['metadata'])
+
+    def count(self, **kwargs):
+        """
+        Returns the number of node instances matching the filters of `list`.
+        """
+        return utils.count(self.list, 'id', **kwargs)
+
+    def count_by(self, field, values, **kwargs):
+        """
+        Returns the number of node instances per value of `field`, see
+        `cloudify_rest_client.utils.count_by`.
+        """
+        return utils.count_by(self.count, field, values, **kwargs)
+
+
+class NodeInstanceUpdatesError(CloudifyClientError):
+    """
+    Raised when several buffered node instance updates failed.
+    """
+
+    def __init__(self, errors):
+        """
+        :param errors: dict mapping the ids of the node instances whose
+                       update failed to the raised errors.
+        """
+        super(NodeInstanceUpdatesError, self).__init__(
+            'Updating {0} node instances failed: {1}'.format(
+                len(errors), ', '.join(sorted(errors))))
+        self.errors = errors
+
+
+class NodeInstanceUpdateBuffer(object):
+    """
+    Write-behind buffer of node instance updates.
+
+    Successive updates of the same node instance are merged (the last
+    state and the last runtime properties win) and sent as a single
+    update, when `flush_interval` seconds passed since the first buffered
+    update, when `max_pending` node instances have buffered updates, or
+    when `flush` or `close` are called. The buffer can be used as a
+    context manager, flushing when exiting the block, also if the block
+    raised.
+
+    The buffer tracks the versions produced by its own updates, so callers
+    may keep passing the version they originally read; a version conflict
+    with another writer is raised as a `ConflictError`, by the call that
+    flushed the update, or by the next call if it was flushed in the
+    background. Other failures, e.g. connection errors, are reported the
+    same way, and don't prevent sending the other updates. When several
+    updates failed, a `NodeInstanceUpdatesError` holding all their errors
+    is raised instead.
+    """
+
+    def __init__(self, client, flush_interval=1, max_pending=100):
+        self.client = client
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.updates = 0
+        self.requests = 0
+        self._pending = {}
+        # node instance id -> (first version sent, last version received)
+        self._versions = {}
+        # node instance id -> error of its last failed update
+        self._errors = {}
+        self._timer = None
+        self._lock = threading.RLock()
+
+    def update(self, node_instance_id, state=None, runtime_properties=None,
+               version=1):
+        """
+        Buffers an update of a node instance, see
+        `NodeInstancesClient.update`.
+        """
+        assert node_instance_id
+        if runtime_properties is not None:
+            # the update is sent later, don't let the caller change it
+            runtime_properties = copy.deepcopy(runtime_properties)
+        with self._lock:
+            self._raise_errors()
+            update = self._pending.setdefault(node_instance_id, {})
+            update['version'] = version
+            if state is not None:
+                update['state'] = state
+            if runtime_properties is not None:
+                update['runtime_properties'] = runtime_properties
+            self.updates += 1
+            if len(self._pending) >= self.max_pending:
+                self.flush()
+            elif self._timer is None and self.flush_interval is not None:
+                self._timer = threading.Timer(self.flush_interval,
+                                              self._flush_in_background)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """
+        Sends the buffered updates.
+
+        :return: dict mapping node instance ids to the updated node
+                 instances.
+        :raises ConflictError: if an update conflicted with another writer
+                               (after the other updates were sent).
+        :raises NodeInstanceUpdatesError: if several updates failed.
+        """
+        with self._lock:
+            updated = self._send_pending()
+            self._raise_errors()
+            return updated
+
+    def close(self):
+        """
+        Flushes the buffered updates, and stops flushing in the background.
+        """
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+            return
+        # don't hide the block's error behind a failed flush
+        try:
+            self.close()
+        except Exception:
+            logger.exception('Failed flushing the buffered node instance '
+                             'updates')
+
+    def _send(self, node_instance_id, version, state=None,
+              runtime_properties=None):
+        first_sent, last_received = self._versions.get(node_instance_id,
+                                                       (None, None))
+        if first_sent is not None and first_sent <= version < last_received:
+            # the caller's version was only outdated by our own updates
+            version = last_received
+        else:
+            first_sent = version
+        self.requests += 1
+        node_instance = self.client.update(
+            node_instance_id, state=state,
+            runtime_properties=runtime_properties, version=version)
+        if node_instance.version is not None:
+            self._versions[node_instance_id] = (first_sent,
+                                                node_instance.version)
+        return node_instance
+
+    def _send_pending(self):
+        self._cancel_timer()
+        pending, self._pending = self._pending, {}
+        updated = {}
+        for node_instance_id, update in pending.items():
+            try:
+                updated[node_instance_id] = self._send(node_instance_id,
+                                                       **update)
+            except Exception as e:
+                self._errors[node_instance_id] = e
+        return updated
+
+    def _flush_in_background(self):
+        with self._lock:
+            self._timer = None
+            # errors are raised on the next call
+            self._send_pending()
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _raise_errors(self):
+        errors, self._errors = self._errors, {}
+        if len(errors) == 1:
+            raise list(errors.values())[0]
+        if errors:
+            raise NodeInstanceUpdatesError(errors)
+
+
+class NodeInstanceCache(object):
+    """
+    Read-through cache of node instances, keyed by id and tracking their
+    version.
+
+    `get` is served from memory once a node instance was retrieved, or
+    revalidated when fresh data is needed: only the stored version is
+    retrieved, and the whole node instance only if it changed. Updates made
+    through the client the cache was created with are written through to
+    the cache. `warm_up` loads all the node instances of the deployment
+    with a single paged sweep.
+
+    Node instances are returned as copies, so changing them doesn't change
+    the cache. The cache stops tracking the client's updates when closed,
+    e.g. when used as a context manager, or once it is garbage collected.
+    """
+
+    def __init__(self, client, deployment_id=None):
+        self.client = client
+        self.deployment_id = deployment_id
+        self.hits = 0
+        self.misses = 0
+        self._node_instances = {}
+        # node instance id -> fields of a partially cached node instance
+        self._projections = {}
+        self._lock = threading.Lock()
+        self._listener = _weak_update_listener(self)
+        client.add_update_listener(self._listener)
+
+    def get(self, node_instance_id, revalidate=False, _include=None):
+        """
+        Returns a node instance, from the cache if possible.
+
+        :param node_instance_id: The identifier of the node instance to get.
+        :param revalidate: Whether to check that the cached version is
+                           still the stored one.
+        :param _include: Optional list of the fields needed. A node
+                         instance cached by `warm_up` with only some of its
+                         fields is retrieved again when a needed field is
+                         missing; by default, all the fields are needed.
+        :return: The node instance.
+        """
+        fields = set(_include or NodeInstance.FIELDS)
+        with self._lock:
+            node_instance = self._node_instances.get(node_instance_id)
+            projection = self._projections.get(node_instance_id)
+        if projection is not None and not fields <= projection:
+            node_instance = None
+        if node_instance is not None and revalidate:
+            stored = self.client.get(node_instance_id,
+                                     _include=['id', 'version'])
+            if stored.version != node_instance.version:
+                node_instance = None
+        if node_instance is None:
+            self.misses += 1
+            node_instance = self.client.get(node_instance_id)
+            self._store(node_instance)
+        else:
+            self.hits += 1
+        return NodeInstance(copy.deepcopy(node_instance))
+
+    def warm_up(self, _include=None, page_size=1000):
+        """
+        Loads all the node instances of the cache's deployment.
+
+        :param _include: Optional list of fields to retrieve; 'id' and
+                         'version' are always retrieved. `get` retrieves
+                         the node instances again when other fields are
+                         needed.
+        :param page_size: Number of node instances to retrieve per request.
+        :return: The number of loaded node instances.
+        """
+        assert self.deployment_id
+        if _include is not None:
+            _include = list(_include) + [field for field in ('id', 'version')
+                                         if field not in _include]
+        loaded = 0
+        for page in iter_pages(self.client.list, page_size=page_size,
+                               deployment_id=self.deployment_id,
+                               _include=_include):
+            for node_instance in page:
+                self._store(node_instance, _include)
+            loaded += len(page)
+        return loaded
+
+    def invalidate(self, node_instance_id=None):
+        """
+        Drops a node instance from the cache, or all of them if no id is
+        provided.
+        """
+        with self._lock:
+            if node_instance_id is None:
+                self._node_instances.clear()
+                self._projections.clear()
+            else:
+                self._node_instances.pop(node_instance_id, None)
+                self._projections.pop(node_instance_id, None)
+
+    def close(self):
+        """
+        Stops tracking the updates made through the client.
+        """
+        self.client.remove_update_listener(self._listener)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __contains__(self, node_instance_id):
+        return node_instance_id in self._node_instances
+
+    def __len__(self):
+        return len(self._node_instances)
+
+    def _store(self, node_instance, _include=None):
+        with self._lock:
+            self._node_instances[node_instance.id] = node_instance
+            if _include is None:
+                self._projections.pop(node_instance.id, None)
+            else:
+                self._projections[node_instance.id] = set(_include)
+
+    def _on_update(self, node_instance):
+        with self._lock:
+            cached = self._node_instances.get(node_instance.id)
+            if cached is not None:
+                cached = NodeInstance(cached)
+                cached.update(copy.deepcopy(node_instance))
+                self._node_instances[node_instance.id] = cached
+                projection = self._projections.get(node_instance.id)
+                if projection is not None:
+                    projection.update(node_instance)
+            elif self.deployment_id is not None and \
+                    node_instance.deployment_id == self.deployment_id:
+                self._node_instances[node_instance.id] = \
+                    NodeInstance(copy.deepcopy(node_instance))
+                self._projections[node_instance.id] = set(node_instance)
+
+
+def _weak_update_listener(cache):
+    # an update listener which doesn't keep the cache alive, and which is
+    # unregistered once the cache is garbage collected
+    client = cache.client
+
+    def listener(node_instance):
+        cache = cache_ref()
+        if cache is not None:
+            cache._on_update(node_instance)
+
+    cache_ref = weakref.ref(
+        cache, lambda ref: client.remove_update_listener(listener))
+    return listener
+
+
+class NodeInstancesSync(object):
+    """
+    Incremental synchronization of node instances, by version.
+
+    The first `sync` retrieves all the matching node instances. The next
+    ones list only the ids and versions of the node instances, then
+    retrieve only the node instances which were added or whose version
+    changed, and report the removed ones. If `_include` is provided among
+    the filters, only these fields (along with 'id' and 'version') are
+    retrieved.
+    """
+
+    def __init__(self, client, listener=None, page_size=DEFAULT_PAGE_SIZE,
+                 **kwargs):
+        self.client = client
+        self.listener = listener
+        self.page_size = page_size
+        _include = kwargs.pop('_include', None)
+        if _include is not None:
+            _include = list(_include) + [field for field in ('id', 'version')
+                                         if field not in _include]
+        self._include = _include
+        self.filters = kwargs
+        # node instance id -> last seen version
+        self.versions = {}
+        self._synced = False
+
+    def sync(self):
+        """
+        Retrieves the changes since the previous sync.
+
+        :return: A `NodeInstancesDelta`.
+        """
+        if not self._synced:
+            fetched = [node_instance
+                       for page in iter_pages(self.client.list,
+                                              page_size=self.page_size,
+                                              _include=self._include,
+                                              **self.filters)
+                       for node_instance in page]
+            removed = []
+        else:
+            versions = {}
+            for page in iter_pages(self.client.list,
+                                   page_size=self.page_size,
+                                   _include=['id', 'version'],
+                                   **self.filters):
+                for node_instance in page:
+                    versions[node_instance.id] = node_instance.version
+            fetched = self._get_node_instances(
+                [node_instance_id
+                 for node_instance_id, version in versions.items()
+                 if self.versions.get(node_instance_id, -1) != version])
+            fetched_ids = set(node_instance.id for node_instance in fetched)
+            # also removed, if removed before being fetched
+            removed = [node_instance_id for node_instance_id in self.versions
+                       if node_instance_id not in versions or
+                       (node_instance_id not in fetched_ids and
+                        versions[node_instance_id] !=
+                        self.versions[node_instance_id])]
+        self._synced = True
+        added = []
+        changed = []
+        for node_instance in fetched:
+            if node_instance.id in self.versions:
+                changed.append(node_instance)
+            else:
+                added.append(node_instance)
+            self.versions[node_instance.id] = node_instance.version
+        for node_instance_id in removed:
+            del self.versions[node_instance_id]
+        if self.listener is not None:
+            for node_instance in added:
+                self.listener('added', node_instance)
+            for node_instance in changed:
+                self.listener('changed', node_instance)
+            for node_instance_id in removed:
+                self.listener('removed', node_instance_id)
+        return NodeInstancesDelta({
+            'added': added,
+            'changed': changed,
+            'removed': removed
+        })
+
+    def _get_node_instances(self, node_instance_ids):
+        node_instances = []
+        for i in range(0, len(node_instance_ids), MAX_IDS_PER_QUERY):
+            chunk = node_instance_ids[i:i + MAX_IDS_PER_QUERY]
+            filters = dict(self.filters, id=chunk, _size=len(chunk),
+                           _include=self._include)
+            node_instances.extend(self.client.list(**filters))
+        return node_instances
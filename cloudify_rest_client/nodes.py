@@ -12,15 +12,25 @@
 #    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
+import copy
 import warnings
 
-from cloudify_rest_client.responses import ListResponse
+from cloudify_rest_client import utils
+from cloudify_rest_client.query import query_method
+from cloudify_rest_client.responses import (ListResponse, lean_model,
+                                            list_in_chunks)
 
 
 class Node(dict):
     """
     Cloudify node.
     """
+    FIELDS = (
+        'id', 'deployment_id', 'blueprint_id', 'type', 'type_hierarchy',
+        'number_of_instances', 'planned_number_of_instances',
+        'deploy_number_of_instances', 'host_id', 'properties',
+        'operations', 'plugins', 'plugins_to_install', 'relationships',
+        'created_by', 'tenant_name')
 
     @property
     def id(self):
@@ -140,18 +150,39 @@ class Node(dict):
         return self['type']
 
 
+LeanNode = lean_model(
+    Node,
+    shared=['deployment_id', 'blueprint_id', 'type', 'created_by',
+            'tenant_name'])
+
+
 class NodesClient(object):
 
     def __init__(self, api):
         self.api = api
+        # deployment id -> node id -> node
+        self._cache = {}
+
+    query = query_method(Node.FIELDS)
 
     def list(self, deployment_id=None, node_id=None, _include=None, sort=None,
-             is_descending=False, evaluate_functions=False, **kwargs):
+             is_descending=False, evaluate_functions=False,
+             lean=False, concurrency=utils.DEFAULT_CONCURRENCY, **kwargs):
         """
         Returns a list of nodes which belong to the deployment identified
         by the provided deployment id.
 
-        :param deployment_id: The deployment's id to list nodes for.
+        `deployment_id` and the `id` filter may also be lists of ids, e.g.
+        of thousands of deployments. The ids are then split into chunks
+        which fit in a request's url, and all the matching nodes are
+        retrieved, paging through the chunks concurrently. `_offset` and
+        `_size` then apply to the merged nodes, in the order of the chunks
+        (see `cloudify_rest_client.responses.list_in_chunks`). Use
+        ``group_by('deployment_id')`` on the result to group them by
+        deployment.
+
+        :param deployment_id: The deployment's id, or list of ids, to list
+                              nodes for.
         :param node_id: If provided, returns only the requested node. This
                         parameter is deprecated, use 'id' instead.
         :param _include: List of fields to include in response.
@@ -160,6 +191,10 @@ class NodesClient(object):
         :param kwargs: Optional filter fields. for a list of available fields
                see the REST service's models.DeploymentNode.fields
         :param evaluate_functions: Evaluate intrinsic functions
+        :param lean: Return memory-lean, read-only models instead of dicts
+                     (see `cloudify_rest_client.responses.LeanModel`).
+        :param concurrency: Maximum number of concurrent requests, when
+                            listing by lists of ids.
         :return: Nodes.
         :rtype: list
         """
@@ -174,12 +209,25 @@ class NodesClient(object):
         if sort:
             params['_sort'] = '-' + sort if is_descending else sort
 
+        model = LeanNode if lean else Node
+        for field in ('deployment_id', 'id'):
+            if isinstance(params.get(field), (list, tuple, set, frozenset)):
+                values = list(params.pop(field))
+                return list_in_chunks(
+                    lambda **chunk_params: self._list(chunk_params, _include,
+                                                      model),
+                    field, values, concurrency=concurrency,
+                    offset=params.pop('_offset', 0),
+                    size=params.pop('_size', None), **params)
+        return self._list(params, _include, model)
+
+    def _list(self, params, _include, model):
         response = self.api.get('/nodes', params=params, _include=_include)
-        return ListResponse([Node(item) for item in response['items']],
+        return ListResponse([model(item) for item in response['items']],
                             response['metadata'])
 
     def get(self, deployment_id, node_id, _include=None,
-            evaluate_functions=False):
+            evaluate_functions=False, use_cache=False):
         """
         Returns the node which belongs to the deployment identified
         by the provided deployment id .
@@ -188,16 +236,76 @@ class NodesClient(object):
         :param node_id: The node id.
         :param _include: List of fields to include in response.
         :param evaluate_functions: Evaluate intrinsic functions
+        :param use_cache: Whether to return the node from the client's
+                          node cache, retrieving and caching it if needed.
+                          Nodes only change on deployment updates; call
+                          `invalidate_cache` after updating a deployment.
+                          Copies of the cached nodes are returned, so they
+                          may be changed freely. Ignored when evaluating
+                          functions.
         :return: Nodes.
         :rtype: Node
         """
         assert deployment_id
         assert node_id
-        result = self.list(deployment_id=deployment_id,
-                           node_id=node_id,
-                           _include=_include,
-                           evaluate_functions=evaluate_functions)
-        if not result:
-            return None
+        return self.get_many(deployment_id, [node_id], _include=_include,
+                             evaluate_functions=evaluate_functions,
+                             use_cache=use_cache).get(node_id)
+
+    def get_many(self, deployment_id, node_ids, _include=None,
+                 evaluate_functions=False, use_cache=False):
+        """
+        Returns many nodes of a deployment, using a single request.
+
+        :param deployment_id: The deployment's id of the nodes.
+        :param node_ids: The node ids.
+        :param _include: List of fields to include in response ('id' is
+                         always included).
+        :param evaluate_functions: Evaluate intrinsic functions
+        :param use_cache: Whether to return the nodes from the client's
+                          node cache, see `get`.
+        :return: dict mapping node ids to the found nodes.
+        """
+        assert deployment_id
+        use_cache = use_cache and not evaluate_functions
+        nodes = {}
+        missing = []
+        cached = self._cache.get(deployment_id, {}) if use_cache else {}
+        for node_id in node_ids:
+            if node_id in cached:
+                nodes[node_id] = copy.deepcopy(cached[node_id])
+            elif node_id not in missing:
+                missing.append(node_id)
+        if not missing:
+            return nodes
+        if use_cache:
+            _include = None
+        elif _include and 'id' not in _include:
+            # the nodes are matched to the requested ids by their id
+            _include = list(_include) + ['id']
+        if len(missing) == 1:
+            response = self._list({'deployment_id': deployment_id,
+                                   'id': missing[0],
+                                   '_evaluate_functions': evaluate_functions},
+                                  _include, Node)
+        else:
+            # many ids are split into requests which fit in a url
+            response = self.list(deployment_id=deployment_id, id=missing,
+                                 _include=_include,
+                                 evaluate_functions=evaluate_functions)
+        for node in response:
+            nodes[node.id] = node
+        if use_cache:
+            self._cache.setdefault(deployment_id, {}).update(
+                (node.id, copy.deepcopy(node)) for node in response)
+        return nodes
+
+    def invalidate_cache(self, deployment_id=None):
+        """
+        Drops the cached nodes of a deployment, or of all the deployments
+        if no deployment id is provided.
+        """
+        if deployment_id is None:
+            self._cache.clear()
         else:
-            return result[0]
+            self._cache.pop(deployment_id, None)
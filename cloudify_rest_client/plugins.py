@@ -18,13 +18,22 @@ import urlparse
 import contextlib
 
 from cloudify_rest_client import bytes_stream_utils
-from cloudify_rest_client.responses import ListResponse
+from cloudify_rest_client import utils
+from cloudify_rest_client.query import query_method
+from cloudify_rest_client.responses import ListResponse, lean_model
 
 
 class Plugin(dict):
     """
     Cloudify plugin.
     """
+    FIELDS = (
+        'id', 'package_name', 'archive_name', 'package_source',
+        'package_version', 'supported_platform', 'distribution',
+        'distribution_version', 'distribution_release', 'wheels',
+        'excluded_wheels', 'supported_py_versions', 'uploaded_at',
+        'created_by', 'tenant_name', 'private_resource')
+
     def __init__(self, plugin):
         super(Plugin, self).__init__()
         self.update(plugin)
@@ -128,6 +137,9 @@ class Plugin(dict):
         return self.get('created_by')
 
 
+LeanPlugin = lean_model(Plugin)
+
+
 class PluginsClient(object):
     """
     Cloudify's plugin management client.
@@ -148,7 +160,10 @@ class PluginsClient(object):
         response = self.api.get(uri, _include=_include)
         return Plugin(response)
 
-    def list(self, _include=None, sort=None, is_descending=False, **kwargs):
+    query = query_method(Plugin.FIELDS)
+
+    def list(self, _include=None, sort=None, is_descending=False,
+             lean=False, **kwargs):
         """
         Returns a list of available plugins.
         :param _include: List of fields to include in response.
@@ -156,6 +171,8 @@ class PluginsClient(object):
         :param is_descending: True for descending order, False for ascending.
         :param kwargs: Optional filter fields. For a list of available fields
                see the REST service's models.Execution.fields
+        :param lean: Return memory-lean, read-only models instead of dicts
+                     (see `cloudify_rest_client.responses.LeanModel`).
         :return: Plugins list.
         """
         params = kwargs
@@ -163,9 +180,23 @@ class PluginsClient(object):
             params['_sort'] = '-' + sort if is_descending else sort
 
         response = self.api.get('/plugins', _include=_include, params=params)
-        return ListResponse([Plugin(item) for item in response['items']],
+        model = LeanPlugin if lean else Plugin
+        return ListResponse([model(item) for item in response['items']],
                             response['metadata'])
 
+    def count(self, **kwargs):
+        """
+        Returns the number of plugins matching the filters of `list`.
+        """
+        return utils.count(self.list, 'id', **kwargs)
+
+    def count_by(self, field, values, **kwargs):
+        """
+        Returns the number of plugins per value of `field`, see
+        `cloudify_rest_client.utils.count_by`.
+        """
+        return utils.count_by(self.count, field, values, **kwargs)
+
     def delete(self, plugin_id, force=False):
         """
         Deletes the plugin whose id matches the provided plugin id.
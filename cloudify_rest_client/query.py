@@ -0,0 +1,169 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+from datetime import datetime
+
+
+def range_filter(field, from_value=None, to_value=None):
+    """
+    Formats a `_range` query parameter value.
+
+    :param field: The field to filter by.
+    :param from_value: Lower bound (inclusive), a datetime or a string.
+    :param to_value: Upper bound (inclusive), a datetime or a string.
+    :return: The `_range` parameter value.
+    """
+    return '{0},{1},{2}'.format(field,
+                                _format_value(from_value),
+                                _format_value(to_value))
+
+
+def _format_value(value):
+    if value is None:
+        return ''
+    # if a datetime instance, convert to iso format
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class Query(dict):
+    """
+    Server-side query for the `list` methods of the different clients.
+
+    A query is a dict of list parameters, so it can be passed directly to
+    a client's `list` or `count` method::
+
+        query = client.executions.query() \\
+            .filter(status=['started', 'pending']) \\
+            .range('created_at', from_value=yesterday) \\
+            .sort('-created_at', 'id') \\
+            .include('id', 'status') \\
+            .page(size=100)
+        executions = client.executions.list(**query)
+
+    When the query is created by a client, field names are validated
+    locally against the fields of the listed resource.
+    """
+
+    def __init__(self, fields=None, params=None):
+        super(Query, self).__init__()
+        self._fields = frozenset(fields) if fields else None
+        if params:
+            self.update(params)
+
+    @property
+    def fields(self):
+        """
+        :return: The fields which may be used by this query, or None if
+         field names are not validated.
+        """
+        return self._fields
+
+    def _validate(self, field):
+        # nested fields, e.g. 'message.text', are validated by their root
+        if self._fields is not None and \
+                field.split('.')[0] not in self._fields:
+            raise ValueError("Unknown field '{0}', expected one of: {1}"
+                             .format(field, ', '.join(sorted(self._fields))))
+        return field
+
+    def filter(self, filters=None, **kwargs):
+        """
+        Adds equality filters. A list, tuple or set value is sent as a
+        multi-value filter, matching any of the values.
+
+        :param filters: Optional dict of filters, for fields which are not
+                        valid keyword names (e.g. '@timestamp').
+        :param kwargs: Filters as field=value.
+        :return: This query.
+        """
+        filters = dict(filters or {}, **kwargs)
+        for field, value in filters.items():
+            self._validate(field)
+            if isinstance(value, (list, tuple, set, frozenset)):
+                value = list(value)
+            self[field] = value
+        return self
+
+    def range(self, field, from_value=None, to_value=None):
+        """
+        Adds a range filter, e.g. on 'created_at' or '@timestamp'.
+
+        :param field: The field to filter by.
+        :param from_value: Lower bound (inclusive), a datetime or a string.
+        :param to_value: Upper bound (inclusive), a datetime or a string.
+        :return: This query.
+        """
+        self._validate(field)
+        self.setdefault('_range', []).append(
+            range_filter(field, from_value, to_value))
+        return self
+
+    def sort(self, *fields):
+        """
+        Sets the sort order. Fields prefixed with '-' are sorted in
+        descending order; later fields break ties of earlier ones.
+
+        :param fields: The fields to sort by.
+        :return: This query.
+        """
+        for field in fields:
+            self._validate(field.lstrip('-'))
+        self['_sort'] = fields[0] if len(fields) == 1 else list(fields)
+        return self
+
+    def include(self, *fields):
+        """
+        Sets the fields to include in the response.
+
+        :param fields: The fields to include.
+        :return: This query.
+        """
+        for field in fields:
+            self._validate(field)
+        self['_include'] = list(fields)
+        return self
+
+    def page(self, offset=None, size=None):
+        """
+        Sets the page to retrieve.
+
+        :param offset: Index of the first item to retrieve.
+        :param size: Maximum number of items to retrieve.
+        :return: This query.
+        """
+        if offset is not None:
+            self['_offset'] = offset
+        if size is not None:
+            self['_size'] = size
+        return self
+
+
+def query_method(fields):
+    """
+    Builds the `query` method of a client, e.g.
+    ``query = query_method(Execution.FIELDS)`` in the class body.
+
+    :param fields: The fields of the listed resource.
+    :return: The method.
+    """
+    def query(self):
+        """
+        Returns a new server-side query for `list`, validating field names
+        against the fields of the listed resource.
+
+        :rtype: cloudify_rest_client.query.Query
+        """
+        return Query(fields)
+    return query
@@ -13,6 +13,25 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
+import urllib
+from array import array
+
+from cloudify_rest_client.utils import (DEFAULT_CONCURRENCY, parse_timestamp,
+                                        run_concurrently)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+DEFAULT_PAGE_SIZE = 1000
+# maximum length of the multi-value filter of a single request, leaving
+# room in the url for the other parameters
+MAX_FILTER_LENGTH = 4000
+TIMESTAMP_FIELDS = ('@timestamp', 'timestamp', 'reported_timestamp')
+# maximum number of distinct strings shared among the items of a lean model
+MAX_SHARED_STRINGS = 100000
+
 
 class Metadata(dict):
     """
@@ -62,6 +81,7 @@ class ListResponse(object):
     def __init__(self, items, metadata):
         self.items = items
         self.metadata = Metadata(metadata)
+        self._indexes = {}
 
     def __iter__(self):
         return iter(self.items)
@@ -73,4 +93,475 @@ class ListResponse(object):
         return len(self.items)
 
     def sort(self, cmp=None, key=None, reverse=False):
+        self._drop_groups()
+        if cmp is None:
+            return self.items.sort(key=key, reverse=reverse)
         return self.items.sort(cmp, key, reverse)
+
+    def sort_by(self, *fields):
+        """
+        Sorts the items in place by one or more fields. The sort is stable;
+        fields prefixed with '-' are sorted in descending order, and items
+        missing a field are sorted before the others.
+
+        :param fields: The fields to sort by, e.g. ('node_id', '-version').
+        """
+        for field in reversed(fields):
+            descending = field.startswith('-')
+            field = field.lstrip('-')
+            self.items.sort(key=lambda item: _sort_key(item, field),
+                            reverse=descending)
+        self._drop_groups()
+
+    def index_by(self, *fields):
+        """
+        Returns an index of the items by one or more fields, e.g.
+        ``index_by('id')``. The index is built on first use and then kept
+        up to date by `extend`.
+
+        :param fields: The fields to index by. When several fields are
+                       given, the index keys are tuples of their values.
+        :return: dict mapping each key to the (last) item having it.
+        """
+        return self._get_index('index', fields)
+
+    def group_by(self, *fields):
+        """
+        Returns the items grouped by one or more fields, e.g.
+        ``group_by('node_id')`` or ``group_by('node_id', 'host_id')``.
+        The groups are built on first use and then kept up to date by
+        `extend`.
+
+        :param fields: The fields to group by. When several fields are
+                       given, the group keys are tuples of their values.
+        :return: dict mapping each key to the list of items having it,
+                 in the order of the items.
+        """
+        return self._get_index('group', fields)
+
+    def lookup(self, **criteria):
+        """
+        Returns the items matching all the given field values, e.g.
+        ``lookup(node_id='vm', host_id='vm_abc123')``, using a cached
+        group index rather than scanning the items.
+
+        :param criteria: Field values to match.
+        :return: List of the matching items.
+        """
+        fields = tuple(sorted(criteria))
+        key = _make_key(criteria, fields)
+        return self._get_index('group', fields).get(key, [])
+
+    def extend(self, items):
+        """
+        Appends items, e.g. those of the next page of a multi-page result,
+        and adds them to the indexes built so far.
+
+        :param items: A `ListResponse` or an iterable of items.
+        """
+        items = list(items)
+        self.items.extend(items)
+        for (kind, fields), index in self._indexes.items():
+            _add_to_index(index, kind, fields, items)
+
+    def _get_index(self, kind, fields):
+        if not fields:
+            raise ValueError('At least one field is required')
+        index = self._indexes.get((kind, fields))
+        if index is None:
+            index = {}
+            _add_to_index(index, kind, fields, self.items)
+            self._indexes[(kind, fields)] = index
+        return index
+
+    def _drop_groups(self):
+        # groups hold items in order, so they are rebuilt after sorting
+        for kind, fields in list(self._indexes):
+            if kind == 'group':
+                del self._indexes[(kind, fields)]
+
+    def to_columns(self, fields, timestamp_fields=None):
+        """
+        Returns the items as columns, for vectorised analytics.
+
+        Columns are NumPy arrays when NumPy is available (timestamps as
+        datetime64, numbers as numeric arrays, anything else as object
+        arrays). Otherwise, numeric columns are `array.array` and the
+        rest are lists.
+
+        :param fields: The fields to return. Nested fields are specified
+                       with dots, e.g. 'context.workflow_id'.
+        :param timestamp_fields: Fields to parse as timestamps. By default
+                                 '@timestamp', 'timestamp',
+                                 'reported_timestamp' and any field whose
+                                 name ends with '_at'.
+        :return: dict mapping each field to its column.
+        """
+        columns = {}
+        for field in fields:
+            values = [get_field(item, field) for item in self.items]
+            if timestamp_fields is None:
+                is_timestamp = field in TIMESTAMP_FIELDS or \
+                    field.endswith('_at')
+            else:
+                is_timestamp = field in timestamp_fields
+            columns[field] = _to_column(values, is_timestamp)
+        return columns
+
+    @staticmethod
+    def iter_columns(list_method, fields, page_size=DEFAULT_PAGE_SIZE,
+                     timestamp_fields=None, **kwargs):
+        """
+        Pages through a list query, yielding the columns of each page
+        (see `to_columns`), so that arbitrarily large results are
+        processed in bounded memory. For example::
+
+            for columns in ListResponse.iter_columns(
+                    client.executions.list, ['workflow_id', 'created_at'],
+                    _include=['workflow_id', 'created_at']):
+                ...
+
+        :param list_method: A client's list method.
+        :param fields: The fields to return.
+        :param page_size: Number of items to retrieve per request.
+        :param timestamp_fields: Fields to parse as timestamps.
+        :param kwargs: Arguments of the list method.
+        :return: Generator of dicts mapping each field to its column.
+        """
+        for page in iter_pages(list_method, page_size, **kwargs):
+            if len(page):
+                yield page.to_columns(fields, timestamp_fields)
+
+
+def get_field(item, field):
+    """
+    Returns the value of a field of an item, or None if it is missing.
+    Nested fields are specified with dots, e.g. 'context.workflow_id'.
+    """
+    value = item.get(field)
+    if value is None and '.' in field:
+        value = item
+        for part in field.split('.'):
+            value = value.get(part) if value is not None else None
+    return value
+
+
+def _make_key(item, fields):
+    if len(fields) == 1:
+        return get_field(item, fields[0])
+    return tuple(get_field(item, field) for field in fields)
+
+
+def _add_to_index(index, kind, fields, items):
+    if kind == 'index':
+        for item in items:
+            index[_make_key(item, fields)] = item
+    else:
+        for item in items:
+            index.setdefault(_make_key(item, fields), []).append(item)
+
+
+def _sort_key(item, field):
+    value = get_field(item, field)
+    return value is not None, value
+
+
+def _to_column(values, is_timestamp=False):
+    if is_timestamp:
+        values = [parse_timestamp(value) for value in values]
+        if numpy is not None:
+            return numpy.array(values, dtype='datetime64[us]')
+        return values
+    types = set(type(value) for value in values)
+    if types and types <= set([int, float]):
+        if numpy is not None:
+            return numpy.array(values)
+        return array('d' if float in types else 'l', values)
+    if len(types) > 1 and types <= set([int, float, type(None)]):
+        # missing numbers are represented as NaN
+        values = [float('nan') if value is None else value
+                  for value in values]
+        if numpy is not None:
+            return numpy.array(values, dtype=float)
+        return array('d', values)
+    if numpy is not None:
+        return numpy.array(values, dtype=object)
+    return values
+
+
+def iter_pages(list_method, page_size=DEFAULT_PAGE_SIZE, **kwargs):
+    """
+    Pages through a list query until all the matching items are retrieved.
+
+    :param list_method: A client's list method.
+    :param page_size: Number of items to retrieve per request.
+    :param kwargs: Arguments of the list method. `_offset` may be given
+                   to start from a specific item.
+    :return: Generator of `ListResponse` pages.
+    """
+    offset = kwargs.pop('_offset', 0)
+    while True:
+        page = list_method(_offset=offset, _size=page_size, **kwargs)
+        yield page
+        offset += len(page)
+        if not len(page) or offset >= page.metadata.pagination.total:
+            return
+
+
+def chunk_values(field, values, max_length=MAX_FILTER_LENGTH):
+    """
+    Splits the values of a multi-value filter into chunks which fit in a
+    request's url.
+
+    :param field: The filtered field.
+    :param values: The values of the filter.
+    :param max_length: Maximum length of the filter of each chunk.
+    :return: List of lists of values.
+    """
+    chunks = []
+    chunk = []
+    length = 0
+    for value in values:
+        # 'field=value&', with unicode values sent utf-8 encoded
+        if isinstance(value, type(u'')):
+            encoded = value.encode('utf-8')
+        else:
+            encoded = str(value)
+        value_length = len(field) + len(urllib.quote(encoded)) + 2
+        if chunk and length + value_length > max_length:
+            chunks.append(chunk)
+            chunk = []
+            length = 0
+        chunk.append(value)
+        length += value_length
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def list_in_chunks(list_method, field, values,
+                   concurrency=DEFAULT_CONCURRENCY,
+                   page_size=DEFAULT_PAGE_SIZE, offset=0, size=None,
+                   **kwargs):
+    """
+    Lists the items matching any of many values of a field, e.g. the node
+    instances of thousands of deployments.
+
+    The values are split into multi-value filters which fit in a request's
+    url (see `chunk_values`). The chunks are paged through concurrently,
+    and their items merged in the order of the chunks. When `offset` or
+    `size` are provided, only the items of that range of the merged items
+    are retrieved: the chunks are counted concurrently first, with a
+    single request each.
+
+    :param list_method: A client's list method, accepting the multi-value
+                        filter and `_offset` and `_size`.
+    :param field: The filtered field.
+    :param values: The values of the filter.
+    :param concurrency: Maximum number of chunks paged concurrently.
+    :param page_size: Number of items to retrieve per request.
+    :param offset: Number of merged items to skip.
+    :param size: Maximum number of merged items to return, or None for
+                 all of them.
+    :param kwargs: Other arguments of the list method.
+    :return: `ListResponse` of the matching items, whose total is the
+             number of all the matching items.
+    """
+    chunks = chunk_values(field, values)
+
+    def list_chunk(chunk, **chunk_kwargs):
+        chunk_kwargs.update(kwargs)
+        chunk_kwargs[field] = chunk
+        return list_method(**chunk_kwargs)
+
+    def list_all(chunk):
+        return [item
+                for page in iter_pages(list_chunk, page_size=page_size,
+                                       chunk=chunk)
+                for item in page]
+
+    if not offset and size is None:
+        items = []
+        for chunk_items in run_concurrently(list_all, chunks, concurrency):
+            items.extend(chunk_items)
+        return ListResponse(items, {'pagination': {'total': len(items),
+                                                   'offset': 0,
+                                                   'size': len(items)}})
+
+    first_pages = run_concurrently(
+        lambda chunk: list_chunk(chunk, _offset=0, _size=1),
+        chunks, concurrency)
+    totals = [page.metadata.pagination.total for page in first_pages]
+    total = sum(totals)
+    remaining = total if size is None else size
+    skip = offset
+    items = []
+    for chunk, first_page, chunk_total in zip(chunks, first_pages, totals):
+        if remaining <= 0:
+            break
+        if skip >= chunk_total:
+            skip -= chunk_total
+            continue
+        chunk_offset = skip
+        skip = 0
+        if chunk_offset == 0:
+            # the counting request already retrieved the first item
+            items.extend(first_page)
+            chunk_offset += len(first_page)
+            remaining -= len(first_page)
+        while remaining > 0 and chunk_offset < chunk_total:
+            page = list_chunk(chunk, _offset=chunk_offset,
+                              _size=min(remaining, page_size))
+            if not len(page):
+                break
+            items.extend(page)
+            chunk_offset += len(page)
+            remaining -= len(page)
+    return ListResponse(items, {'pagination': {'total': total,
+                                               'offset': offset,
+                                               'size': len(items)}})
+
+
+_MISSING = object()
+
+
+class LeanModel(object):
+    """
+    Base class of the memory-lean, read-only representation of models.
+
+    The dict based models hold a hash table per item. A lean model keeps
+    the values of the model's known fields in a flat list, with the field
+    names shared by all the items of a model, and references the nested
+    values of the response (e.g. runtime properties or a plan) without
+    copying them. String values of low-cardinality fields (e.g. the
+    deployment id or state of node instances) are shared among items
+    instead of being held once per item, keeping up to
+    `MAX_SHARED_STRINGS` strings per model. Fields which need to be
+    wrapped (e.g. the workflows of a deployment) are only wrapped when
+    first accessed.
+
+    Lean models support the same properties as their dict based
+    counterparts, along with read-only dict access (`[]`, `get`, `in`,
+    `keys`, `items`...). Use `to_dict` where an actual dict is required,
+    e.g. for JSON serialization.
+    """
+    __slots__ = ('_values', '_extra')
+    _fields = ()
+    _index = {}
+    _wrappers = {}
+    _shared = ()
+    _pool = {}
+
+    def __init__(self, item):
+        index = self._index
+        self._values = [item.get(field, _MISSING) for field in self._fields]
+        pool = self._pool
+        for position in self._shared:
+            value = self._values[position]
+            if value.__class__ in (str, type(u'')):
+                if len(pool) >= MAX_SHARED_STRINGS:
+                    pool.clear()
+                self._values[position] = pool.setdefault(value, value)
+        extra = [key for key in item if key not in index]
+        self._extra = dict((key, item[key]) for key in extra) \
+            if extra else None
+
+    def __getitem__(self, key):
+        position = self._index.get(key)
+        if position is None:
+            if self._extra is None:
+                raise KeyError(key)
+            return self._extra[key]
+        value = self._values[position]
+        if value is _MISSING:
+            raise KeyError(key)
+        wrapper = self._wrappers.get(key)
+        if wrapper is not None:
+            value = self._values[position] = wrapper(value)
+        return value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        position = self._index.get(key)
+        if position is None:
+            return self._extra is not None and key in self._extra
+        return self._values[position] is not _MISSING
+
+    def keys(self):
+        keys = [field for field, value in zip(self._fields, self._values)
+                if value is not _MISSING]
+        if self._extra:
+            keys.extend(self._extra)
+        return keys
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __eq__(self, other):
+        if isinstance(other, (LeanModel, dict)):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '{0}({1!r})'.format(type(self).__name__, self.to_dict())
+
+    def to_dict(self):
+        """
+        :return: A dict with the item's fields.
+        """
+        return dict(self.items())
+
+
+def lean_model(model_class, wrappers=None, shared=None):
+    """
+    Creates the lean counterpart of a dict based model.
+
+    :param model_class: A dict based model class declaring its FIELDS.
+    :param wrappers: Optional dict of field name to a callable wrapping
+                     the field's value on first access. Wrappers must be
+                     idempotent.
+    :param shared: Optional low-cardinality fields whose string values
+                   are shared among all the items of the model.
+    :return: A `LeanModel` subclass with the model's properties and
+             constants.
+    """
+    namespace = {
+        '__slots__': (),
+        '__doc__': model_class.__doc__,
+        '_fields': tuple(model_class.FIELDS),
+        '_index': dict((field, position) for position, field
+                       in enumerate(model_class.FIELDS)),
+        '_wrappers': wrappers or {},
+        '_shared': tuple(model_class.FIELDS.index(field)
+                         for field in shared or ()),
+        '_pool': {},
+    }
+    for klass in reversed(model_class.__mro__):
+        if klass in (dict, object):
+            continue
+        for name, attribute in vars(klass).items():
+            if name.startswith('__') or callable(attribute):
+                continue
+            namespace[name] = attribute
+    return type('Lean{0}'.format(model_class.__name__), (LeanModel,),
+                namespace)
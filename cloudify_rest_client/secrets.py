@@ -13,10 +13,15 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
-from cloudify_rest_client.responses import ListResponse
+from cloudify_rest_client import utils
+from cloudify_rest_client.query import query_method
+from cloudify_rest_client.responses import ListResponse, lean_model
 
 
 class Secret(dict):
+    FIELDS = (
+        'key', 'value', 'created_at', 'updated_at', 'created_by',
+        'tenant_name', 'private_resource')
 
     def __init__(self, secret):
         super(Secret, self).__init__()
@@ -51,6 +56,9 @@ class Secret(dict):
         return self.get('updated_at')
 
 
+LeanSecret = lean_model(Secret)
+
+
 class SecretsClient(object):
 
     def __init__(self, api):
@@ -72,14 +80,20 @@ class SecretsClient(object):
         response = self.api.get('/secrets/{0}'.format(key))
         return Secret(response)
 
-    def list(self, sort=None, is_descending=False, **kwargs):
+    query = query_method(Secret.FIELDS)
+
+    def list(self, sort=None, is_descending=False, _include=None,
+             lean=False, **kwargs):
         """
         Returns a list of currently stored secrets.
 
         :param sort: Key for sorting the list.
         :param is_descending: True for descending order, False for ascending.
+        :param _include: List of fields to include in response.
         :param kwargs: Optional filter fields. For a list of available fields
                see the REST service's models.Secret.fields
+        :param lean: Return memory-lean, read-only models instead of dicts
+                     (see `cloudify_rest_client.responses.LeanModel`).
         :return: Secrets list.
         """
 
@@ -87,10 +101,24 @@ class SecretsClient(object):
         if sort:
             params['_sort'] = '-' + sort if is_descending else sort
 
-        response = self.api.get('/secrets', params=params)
-        return ListResponse([Secret(item) for item in response['items']],
+        response = self.api.get('/secrets', params=params, _include=_include)
+        model = LeanSecret if lean else Secret
+        return ListResponse([model(item) for item in response['items']],
                             response['metadata'])
 
+    def count(self, **kwargs):
+        """
+        Returns the number of secrets matching the filters of `list`.
+        """
+        return utils.count(self.list, 'key', **kwargs)
+
+    def count_by(self, field, values, **kwargs):
+        """
+        Returns the number of secrets per value of `field`, see
+        `cloudify_rest_client.utils.count_by`.
+        """
+        return utils.count_by(self.count, field, values, **kwargs)
+
     def delete(self, key):
         response = self.api.delete('/secrets/{0}'.format(key))
         return Secret(response)
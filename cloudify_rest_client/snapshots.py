@@ -19,6 +19,7 @@ import contextlib
 
 from cloudify_rest_client import bytes_stream_utils
 from cloudify_rest_client.executions import Execution
+from cloudify_rest_client.query import query_method
 from cloudify_rest_client.responses import ListResponse
 
 
@@ -26,6 +27,9 @@ class Snapshot(dict):
     """
     Cloudify snapshot.
     """
+    FIELDS = (
+        'id', 'created_at', 'created_by', 'status', 'error', 'tenant_name',
+        'private_resource')
 
     def __init__(self, snapshot):
         super(Snapshot, self).__init__()
@@ -88,6 +92,8 @@ class SnapshotsClient(object):
         response = self.api.get(uri, _include=_include)
         return Snapshot(response)
 
+    query = query_method(Snapshot.FIELDS)
+
     def list(self, _include=None, sort=None, is_descending=False, **kwargs):
         """
         Returns a list of currently stored snapshots.
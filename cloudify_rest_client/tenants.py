@@ -13,10 +13,14 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
+from cloudify_rest_client import utils
+from cloudify_rest_client.query import query_method
 from cloudify_rest_client.responses import ListResponse
 
 
 class Tenant(dict):
+    FIELDS = (
+        'id', 'name', 'users', 'groups')
 
     def __init__(self, tenant):
         super(Tenant, self).__init__()
@@ -49,6 +53,8 @@ class TenantsClient(object):
     def __init__(self, api):
         self.api = api
 
+    query = query_method(Tenant.FIELDS)
+
     def list(self, _include=None, sort=None, is_descending=False, **kwargs):
         """
         Returns a list of currently stored tenants.
@@ -70,6 +76,19 @@ class TenantsClient(object):
         return ListResponse([Tenant(item) for item in response['items']],
                             response['metadata'])
 
+    def count(self, **kwargs):
+        """
+        Returns the number of tenants matching the filters of `list`.
+        """
+        return utils.count(self.list, 'name', **kwargs)
+
+    def count_by(self, field, values, **kwargs):
+        """
+        Returns the number of tenants per value of `field`, see
+        `cloudify_rest_client.utils.count_by`.
+        """
+        return utils.count_by(self.count, field, values, **kwargs)
+
     def create(self, tenant_name):
         response = self.api.post(
             '/tenants/{0}'.format(tenant_name),
@@ -0,0 +1,130 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+import unittest
+
+from cloudify_rest_client.bytes_stream_utils import multipart_stream_gen
+from cloudify_rest_client.utils import tar_blueprint, tar_blueprint_stream
+
+
+class TarBlueprintStreamTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.blueprint_dir = os.path.join(self.tempdir, 'bp')
+        os.makedirs(os.path.join(self.blueprint_dir, 'scripts', 'empty'))
+        self.blueprint_path = self._write('blueprint.yaml',
+                                          b'tosca_definitions_version: x\n')
+        self._write(os.path.join('scripts', 'install.sh'), b'echo 1\n' * 100)
+        self._write('resource.bin', os.urandom(256 * 1024))
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def _write(self, name, content):
+        path = os.path.join(self.blueprint_dir, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def _read_archive(self, fileobj):
+        members = {}
+        with tarfile.open(fileobj=fileobj, mode='r:gz') as tar:
+            for member in tar.getmembers():
+                content = None
+                if member.isreg():
+                    content = tar.extractfile(member).read()
+                members[member.name] = (member.type, member.mode, content)
+        return members
+
+    def test_same_content_as_tar_blueprint(self):
+        dest_dir = tempfile.mkdtemp(dir=self.tempdir)
+        with open(tar_blueprint(self.blueprint_path, dest_dir), 'rb') as f:
+            expected = self._read_archive(f)
+        progress = []
+        archive = b''.join(tar_blueprint_stream(
+            self.blueprint_path, chunk_size=4096,
+            progress_callback=lambda read, total: progress.append(
+                (read, total))))
+        self.assertEqual(expected, self._read_archive(io.BytesIO(archive)))
+        self.assertTrue('blueprint/scripts/empty' in expected)
+        total = len(b'tosca_definitions_version: x\n') + 700 + 256 * 1024
+        self.assertEqual((total, total), progress[-1])
+
+    def test_close_stops_the_worker(self):
+        threads = set(threading.enumerate())
+        chunks = tar_blueprint_stream(self.blueprint_path, chunk_size=1024,
+                                      queued_chunks=1)
+        next(chunks)
+        workers = [thread for thread in threading.enumerate()
+                   if thread not in threads]
+        self.assertEqual(1, len(workers))
+        # the worker is blocked on the full queue until the stream is closed
+        self.assertTrue(workers[0].is_alive())
+        chunks.close()
+        workers[0].join(5)
+        self.assertFalse(workers[0].is_alive())
+
+
+class MultipartStreamTest(unittest.TestCase):
+
+    def _parts(self, content_type, body):
+        prefix = 'multipart/form-data; boundary='
+        self.assertTrue(content_type.startswith(prefix))
+        delimiter = b'--' + content_type[len(prefix):].encode('utf-8')
+        chunks = body.split(delimiter)
+        self.assertEqual(b'', chunks[0])
+        self.assertEqual(b'--\r\n', chunks[-1])
+        parts = {}
+        for part in chunks[1:-1]:
+            self.assertTrue(part.startswith(b'\r\n'))
+            self.assertTrue(part.endswith(b'\r\n'))
+            headers, content = part[2:-2].split(b'\r\n\r\n', 1)
+            headers = headers.decode('utf-8').split('\r\n')
+            name = headers[0].split('name="')[1].split('"')[0]
+            parts[name] = (headers, content)
+        return parts
+
+    def test_framing(self):
+        content_type, body = multipart_stream_gen({
+            'blueprint_archive': ('bp.tar.gz', iter([b'ab', b'', b'cd']),
+                                  None),
+            'inputs': ('inputs.yaml', io.BytesIO(b'x: 1\r\ny: 2\n'),
+                       'application/x-yaml')
+        }, buffer_size=3)
+        parts = self._parts(content_type, b''.join(body))
+        self.assertEqual({
+            'blueprint_archive': (
+                ['Content-Disposition: form-data; name="blueprint_archive"; '
+                 'filename="bp.tar.gz"',
+                 'Content-Type: application/octet-stream'],
+                b'abcd'),
+            'inputs': (
+                ['Content-Disposition: form-data; name="inputs"; '
+                 'filename="inputs.yaml"',
+                 'Content-Type: application/x-yaml'],
+                b'x: 1\r\ny: 2\n')
+        }, parts)
+
+    def test_boundary_is_unique(self):
+        first, _ = multipart_stream_gen({})
+        second, _ = multipart_stream_gen({})
+        self.assertNotEqual(first, second)
@@ -0,0 +1,68 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import unittest
+
+from cloudify_rest_client.evaluate import EvaluateClient
+from cloudify_rest_client.node_instances import NodeInstance
+
+
+class _EvaluateAPI(object):
+
+    def __init__(self):
+        self.requests = []
+
+    def post(self, uri, data=None, **kwargs):
+        self.requests.append((uri, data))
+        return {'deployment_id': data['deployment_id'],
+                'payload': data['payload']}
+
+
+class EvaluateMemoTest(unittest.TestCase):
+
+    def setUp(self):
+        self.api = _EvaluateAPI()
+        self.client = EvaluateClient(self.api, max_memoized=3)
+        self.context = {'self': 'vm_1'}
+
+    def _functions(self, payload=None):
+        return self.client.functions('dep', self.context,
+                                     payload or {'ip': 1}, use_cache=True)
+
+    def test_hits_send_no_requests(self):
+        for _ in range(3):
+            self.assertEqual({'ip': 1}, self._functions().payload)
+        self.assertEqual(1, len(self.api.requests))
+        self.assertEqual((2, 1), (self.client.hits, self.client.misses))
+
+    def test_node_instance_update_invalidates(self):
+        self._functions()
+        self.client.on_node_instance_update(
+            NodeInstance({'id': 'vm_1', 'deployment_id': 'dep'}))
+        self._functions()
+        self.assertEqual(2, len(self.api.requests))
+
+    def test_expired_evaluations_are_not_used(self):
+        self.client.memo_ttl = 0
+        self._functions()
+        self._functions()
+        self.assertEqual(2, len(self.api.requests))
+
+    def test_memo_is_bounded(self):
+        evaluations = [(self.context, {'ip': i}) for i in range(5)]
+        self.client.functions_many('dep', evaluations, use_cache=True)
+        self.assertEqual(3, len(self.client._memo))
+        self.client.functions_many('dep', evaluations[2:], use_cache=True)
+        self.assertEqual(1, len(self.api.requests))
@@ -0,0 +1,166 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import json
+import time
+import threading
+import unittest
+
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from cloudify_rest_client import CloudifyClient
+from cloudify_rest_client.events import (SSETransport,
+                                         TransportUnavailable,
+                                         _parse_sse)
+
+EVENTS = [{'execution_id': 'exec1',
+           '@timestamp': '2017-01-01T00:00:0{0}.000Z'.format(i),
+           'message': {'text': 'event {0}'.format(i)},
+           'type': 'cloudify_event'} for i in range(6)]
+
+
+class _StandInManagerHandler(BaseHTTPRequestHandler):
+    """
+    Serves the event stream, the events list and the execution status of
+    a single execution whose events are `EVENTS`.
+
+    Each stream connection delivers at most `messages_per_connection`
+    messages, resuming after the Last-Event-ID header, so that clients
+    have to reconnect to receive all the events. When `hold_open` is set,
+    the connection is then held open until it is released.
+    """
+    stream_available = True
+    messages_per_connection = 3
+    stream_requests = []
+    hold_open = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if path.endswith('/events/stream'):
+            self._stream()
+        elif path.endswith('/events'):
+            self._send_json({'items': EVENTS,
+                             'metadata': {'pagination': {
+                                 'total': len(EVENTS),
+                                 'offset': 0,
+                                 'size': len(EVENTS)}}})
+        elif path.endswith('/executions/exec1'):
+            self._send_json({'id': 'exec1', 'status': self._status()})
+        else:
+            self._send_json({'message': 'Not found',
+                             'error_code': 'not_found_error'}, status=404)
+
+    def _status(self):
+        if self.stream_available and len(self.stream_requests) * \
+                self.messages_per_connection < len(EVENTS):
+            return 'started'
+        return 'terminated'
+
+    def _stream(self):
+        last_event_id = self.headers.get('Last-Event-ID')
+        self.stream_requests.append(last_event_id)
+        if not self.stream_available:
+            self._send_json({'message': 'Not found',
+                             'error_code': 'not_found_error'}, status=404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        start = 0 if last_event_id is None else int(last_event_id) + 1
+        self._write(': keep-alive\n\n')
+        for i in range(start, min(start + self.messages_per_connection,
+                                  len(EVENTS))):
+            self._write('id: {0}\ndata: {1}\n\n'.format(
+                i, json.dumps(EVENTS[i])))
+        if self.hold_open is not None:
+            self.hold_open.wait(10)
+
+    def _send_json(self, body, status=200):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self._write(json.dumps(body))
+
+    def _write(self, data):
+        self.wfile.write(data.encode('utf-8'))
+        self.wfile.flush()
+
+
+class EventsStreamTest(unittest.TestCase):
+
+    def setUp(self):
+        _StandInManagerHandler.stream_available = True
+        _StandInManagerHandler.stream_requests = []
+        _StandInManagerHandler.messages_per_connection = 3
+        _StandInManagerHandler.hold_open = None
+        self.server = HTTPServer(('127.0.0.1', 0), _StandInManagerHandler)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.client = CloudifyClient(host='127.0.0.1',
+                                     port=self.server.server_address[1])
+
+    def tearDown(self):
+        if _StandInManagerHandler.hold_open is not None:
+            _StandInManagerHandler.hold_open.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_parse_sse(self):
+        lines = [b': comment', b'id: 1', b'data: first', b'data: line', b'',
+                 b'', u'data:second', u'', u'id: 3', u'data: unterminated']
+        self.assertEqual([('1', 'first\nline'),
+                          (None, 'second'),
+                          ('3', 'unterminated')],
+                         list(_parse_sse(lines)))
+
+    def test_stream_reconnects_after_last_event_id(self):
+        events = list(self.client.events.stream(execution_id='exec1'))
+        self.assertEqual(EVENTS, events)
+        self.assertEqual([None, '2'],
+                         _StandInManagerHandler.stream_requests)
+
+    def test_events_are_delivered_while_the_stream_is_open(self):
+        _StandInManagerHandler.messages_per_connection = 1
+        _StandInManagerHandler.hold_open = threading.Event()
+        events = self.client.events.stream(execution_id='exec1')
+        started = time.time()
+        self.assertEqual(EVENTS[0], next(events))
+        self.assertTrue(time.time() - started < 5)
+        self.assertFalse(_StandInManagerHandler.hold_open.is_set())
+        events.close()
+
+    def test_stream_with_sse_transport(self):
+        events = list(self.client.events.stream(
+            execution_id='exec1', transport=SSETransport()))
+        self.assertEqual(EVENTS, events)
+
+    def test_stream_falls_back_to_polling(self):
+        _StandInManagerHandler.stream_available = False
+        events = list(self.client.events.stream(execution_id='exec1'))
+        self.assertEqual(EVENTS, events)
+        self.assertEqual([None], _StandInManagerHandler.stream_requests)
+
+    def test_sse_transport_unavailable(self):
+        _StandInManagerHandler.stream_available = False
+        events = self.client.events.stream(execution_id='exec1',
+                                           transport=SSETransport())
+        self.assertRaises(TransportUnavailable, list, events)
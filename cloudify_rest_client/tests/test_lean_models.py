@@ -0,0 +1,105 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import json
+import sys
+import unittest
+
+from cloudify_rest_client import responses
+from cloudify_rest_client.node_instances import (LeanNodeInstance,
+                                                 NodeInstance)
+from cloudify_rest_client.responses import LeanModel
+
+ITEMS = 2000
+
+
+def _node_instances_json(count, deployments=1):
+    return json.dumps([{
+        'id': 'vm_{0:06d}'.format(i),
+        'node_id': 'vm',
+        'deployment_id': 'dep_{0}'.format(i % deployments),
+        'host_id': 'vm_{0:06d}'.format(i),
+        'relationships': [{
+            'target_id': 'net_1',
+            'target_name': 'net',
+            'type': 'cloudify.relationships.connected_to'}],
+        'runtime_properties': {'ip': '10.0.0.{0}'.format(i % 250)},
+        'scaling_groups': [],
+        'state': 'started',
+        'version': 3,
+        'created_by': 'admin',
+        'tenant_name': 'default_tenant'} for i in range(count)])
+
+
+def _deep_size(value, seen):
+    # size of the objects reachable from value, counting shared objects
+    # once
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, LeanModel):
+        size += _deep_size(value._values, seen)
+        if value._extra is not None:
+            size += _deep_size(value._extra, seen)
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            size += _deep_size(key, seen) + _deep_size(item, seen)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            size += _deep_size(item, seen)
+    return size
+
+
+def _memory_sizes(count):
+    # memory held by dict based and lean node instances of a deployment
+    sizes = {}
+    for model in (NodeInstance, LeanNodeInstance):
+        items = [model(item)
+                 for item in json.loads(_node_instances_json(count))]
+        sizes[model] = _deep_size(items, set())
+    return sizes[NodeInstance], sizes[LeanNodeInstance]
+
+
+class LeanModelsMemoryTest(unittest.TestCase):
+    """
+    Compares the memory held by lean and dict based node instances. Run
+    this module directly to print the sizes for a large deployment.
+    """
+
+    def test_lean_node_instances_use_less_memory(self):
+        dict_size, lean_size = _memory_sizes(ITEMS)
+        self.assertTrue(lean_size < dict_size * 0.75,
+                        '{0} >= 75% of {1}'.format(lean_size, dict_size))
+
+    def test_shared_strings_are_bounded(self):
+        original = responses.MAX_SHARED_STRINGS
+        responses.MAX_SHARED_STRINGS = 10
+        try:
+            items = [LeanNodeInstance(item) for item in json.loads(
+                _node_instances_json(100, deployments=50))]
+            self.assertTrue(len(LeanNodeInstance._pool) <= 10)
+            self.assertEqual(['dep_{0}'.format(i % 50) for i in range(100)],
+                             [item.deployment_id for item in items])
+        finally:
+            responses.MAX_SHARED_STRINGS = original
+            LeanNodeInstance._pool.clear()
+
+
+if __name__ == '__main__':
+    dict_size, lean_size = _memory_sizes(100000)
+    print('node instances: {0} bytes as dicts, {1} bytes as lean models '
+          '({2:.0%})'.format(dict_size, lean_size,
+                             float(lean_size) / dict_size))
@@ -0,0 +1,73 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import unittest
+
+from cloudify_rest_client.responses import (ListResponse, chunk_values,
+                                            list_in_chunks)
+
+DEPLOYMENTS = ['deployment_{0:04d}'.format(i) for i in range(600)]
+NODE_INSTANCES = [{'id': 'vm_{0}'.format(i),
+                   'deployment_id': DEPLOYMENTS[i * 7 % len(DEPLOYMENTS)]}
+                  for i in range(90)]
+
+
+class _ChunkedList(object):
+
+    def __init__(self):
+        self.requests = []
+
+    def __call__(self, deployment_id, _offset=0, _size=1000):
+        self.requests.append((_offset, _size))
+        items = [item for item in NODE_INSTANCES
+                 if item['deployment_id'] in deployment_id]
+        return ListResponse(items[_offset:_offset + _size],
+                            {'pagination': {'total': len(items),
+                                            'offset': _offset,
+                                            'size': _size}})
+
+
+class ListInChunksTest(unittest.TestCase):
+
+    def setUp(self):
+        self.list_method = _ChunkedList()
+        self.all_ids = [item['id'] for item in list_in_chunks(
+            _ChunkedList(), 'deployment_id', DEPLOYMENTS)]
+
+    def _list(self, **kwargs):
+        return list_in_chunks(self.list_method, 'deployment_id',
+                              DEPLOYMENTS, **kwargs)
+
+    def test_lists_all_items(self):
+        self.assertEqual(sorted(item['id'] for item in NODE_INSTANCES),
+                         sorted(self.all_ids))
+
+    def test_count_sends_a_request_per_chunk(self):
+        response = self._list(size=1)
+        chunks = chunk_values('deployment_id', DEPLOYMENTS)
+        self.assertTrue(len(chunks) > 1)
+        self.assertEqual(len(NODE_INSTANCES),
+                         response.metadata.pagination.total)
+        self.assertEqual([(0, 1)] * len(chunks), self.list_method.requests)
+
+    def test_offset_and_size_apply_to_merged_items(self):
+        for offset, size in ((0, 5), (25, 10), (85, 10), (100, 5),
+                             (3, None)):
+            response = self._list(offset=offset, size=size)
+            end = None if size is None else offset + size
+            self.assertEqual(self.all_ids[offset:end],
+                             [item['id'] for item in response])
+            self.assertEqual(len(NODE_INSTANCES),
+                             response.metadata.pagination.total)
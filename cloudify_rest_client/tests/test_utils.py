@@ -0,0 +1,85 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import unittest
+from datetime import datetime
+
+from cloudify_rest_client.responses import ListResponse
+from cloudify_rest_client.utils import count, count_by, parse_timestamp
+
+
+class ParseTimestampTest(unittest.TestCase):
+
+    def test_utc(self):
+        expected = datetime(2017, 4, 19, 10, 31, 15, 123000)
+        for value in ('2017-04-19T10:31:15.123Z',
+                      '2017-04-19 10:31:15.123',
+                      '2017-04-19T10:31:15.123+00:00',
+                      '2017-04-19T10:31:15.123+0000'):
+            self.assertEqual(expected, parse_timestamp(value))
+
+    def test_utc_offsets(self):
+        expected = datetime(2017, 4, 19, 10, 31, 15)
+        for value in ('2017-04-19T12:31:15+02:00',
+                      '2017-04-19T12:31:15+0200',
+                      '2017-04-19T05:01:15-05:30',
+                      '2017-04-19T05:01:15-0530'):
+            self.assertEqual(expected, parse_timestamp(value))
+
+    def test_invalid(self):
+        for value in ('2017-04-19T10:31:15+2',
+                      '2017-04-19T10:31:15 UTC',
+                      'yesterday'):
+            self.assertRaises(ValueError, parse_timestamp, value)
+
+    def test_not_parsed(self):
+        now = datetime.utcnow()
+        self.assertEqual(now, parse_timestamp(now))
+        self.assertEqual(None, parse_timestamp(None))
+
+
+class CountTest(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+    def _list(self, **kwargs):
+        self.calls.append(kwargs)
+        total = 10 if kwargs.get('status') == 'started' else 3
+        return ListResponse([{'id': 'a'}], {
+            'pagination': {'total': total, 'offset': 0, 'size': 1}})
+
+    def test_count(self):
+        self.assertEqual(10, count(self._list, status='started',
+                                   _offset=20, _size=100))
+        self.assertEqual([{'status': 'started', '_size': 1,
+                           '_include': ['id']}], self.calls)
+
+    def test_count_without_include(self):
+        self.assertEqual(3, count(self._list, None))
+        self.assertEqual([{'_size': 1}], self.calls)
+
+    def test_count_by(self):
+        def _count(**kwargs):
+            return count(self._list, 'name', **kwargs)
+
+        self.assertEqual({'started': 10, 'terminated': 3},
+                         count_by(_count, 'status',
+                                  ['started', 'terminated'],
+                                  deployment_id='d'))
+        self.assertEqual(2, len(self.calls))
+        for call in self.calls:
+            self.assertEqual('d', call['deployment_id'])
+            self.assertEqual(['name'], call['_include'])
@@ -0,0 +1,315 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+from collections import deque
+
+from cloudify_rest_client.responses import DEFAULT_PAGE_SIZE, iter_pages
+
+CONTAINED_IN = 'cloudify.relationships.contained_in'
+
+
+class DeploymentTopology(object):
+    """
+    In-memory graph of a deployment's nodes and node instances.
+
+    The nodes and node instances are loaded with two paged sweeps, and
+    indexed so that containment, relationships, hosts, instances of a node
+    and scaling group members are looked up without further requests::
+
+        topology = DeploymentTopology(client, 'dep1').load()
+        for instance in topology.contents(vm_instance_id, recursive=True):
+            ...
+
+    `refresh` reloads only the node instances whose version changed.
+    """
+
+    def __init__(self, client, deployment_id, page_size=DEFAULT_PAGE_SIZE):
+        """
+        :param client: A `CloudifyClient`.
+        :param deployment_id: The deployment's id.
+        :param page_size: Number of items to retrieve per request.
+        """
+        self.client = client
+        self.deployment_id = deployment_id
+        self.page_size = page_size
+        self._nodes = {}
+        self._node_instances = {}
+        self._sync = None
+        self._clear_indexes()
+
+    def load(self):
+        """
+        Loads all the nodes and node instances of the deployment.
+
+        :return: This topology.
+        """
+        self._load_nodes()
+        self._node_instances = {}
+        self._clear_indexes()
+        self._sync = self.client.node_instances.sync(
+            page_size=self.page_size, deployment_id=self.deployment_id)
+        self._apply(self._sync.sync())
+        return self
+
+    def refresh(self):
+        """
+        Updates the topology with the node instances which were added,
+        changed or removed since it was loaded. Only the ids and versions
+        of the node instances are listed, and only the new and changed
+        node instances are retrieved
+        (see `cloudify_rest_client.node_instances.NodeInstancesSync`).
+
+        :return: A `cloudify_rest_client.node_instances.NodeInstancesDelta`.
+        """
+        assert self._sync is not None, 'The topology was not loaded'
+        delta = self._sync.sync()
+        if any(node_instance.node_id not in self._nodes
+               for node_instance in delta.added):
+            # e.g. after a deployment update added nodes
+            self._load_nodes()
+        self._apply(delta)
+        return delta
+
+    def _apply(self, delta):
+        # only the index entries of the removed and changed node instances
+        # are replaced
+        for node_instance_id in delta.removed:
+            self._unindex(self._node_instances.pop(node_instance_id))
+        for node_instance in delta.added + delta.changed:
+            previous = self._node_instances.get(node_instance.id)
+            if previous is not None:
+                self._unindex(previous)
+            self._node_instances[node_instance.id] = node_instance
+            self._index(node_instance)
+
+    @property
+    def nodes(self):
+        """
+        :return: The deployment's nodes.
+        """
+        return list(self._nodes.values())
+
+    @property
+    def node_instances(self):
+        """
+        :return: The deployment's node instances.
+        """
+        return list(self._node_instances.values())
+
+    def node(self, node_id):
+        """
+        :return: The node with the provided id, or None.
+        """
+        return self._nodes.get(node_id)
+
+    def node_instance(self, node_instance_id):
+        """
+        :return: The node instance with the provided id, or None.
+        """
+        return self._node_instances.get(node_instance_id)
+
+    def instances_of(self, node_id):
+        """
+        :return: The node instances of a node.
+        """
+        return self._get_all(self._instances_of_node.get(node_id, ()))
+
+    def contained_in(self, node_instance_id):
+        """
+        :return: The node instance which contains a node instance (its
+         contained_in relationship target), or None.
+        """
+        return self._node_instances.get(
+            self._container.get(node_instance_id))
+
+    def contents(self, node_instance_id, recursive=False):
+        """
+        :param node_instance_id: The id of the containing node instance.
+        :param recursive: Whether to also return the contents of the
+                          contained node instances.
+        :return: The node instances contained in a node instance.
+        """
+        contained = self._contained.get(node_instance_id, ())
+        if not recursive:
+            return self._get_all(contained)
+        result = []
+        remaining = deque(contained)
+        while remaining:
+            contained_id = remaining.popleft()
+            result.append(contained_id)
+            remaining.extend(self._contained.get(contained_id, ()))
+        return self._get_all(result)
+
+    def connected_to(self, node_instance_id):
+        """
+        :return: The targets of a node instance's relationships, other than
+         contained_in.
+        """
+        return self._get_all(self._connected_to.get(node_instance_id, ()))
+
+    def connected_from(self, node_instance_id):
+        """
+        :return: The node instances having a relationship, other than
+         contained_in, targeting a node instance.
+        """
+        return self._get_all(self._connected_from.get(node_instance_id, ()))
+
+    def host(self, node_instance_id):
+        """
+        :return: The host node instance of a node instance, or None.
+        """
+        node_instance = self._node_instances.get(node_instance_id)
+        if node_instance is None:
+            return None
+        return self._node_instances.get(node_instance.host_id)
+
+    def hosted_on(self, host_id):
+        """
+        :return: The node instances hosted on a host node instance, not
+         including the host itself.
+        """
+        return self._get_all(self._hosted_on.get(host_id, ()))
+
+    def scaling_group_members(self, group):
+        """
+        :param group: The name of a scaling group, or the id of one of its
+                      instances.
+        :return: The node instances which are members of the group.
+        """
+        return self._get_all(self._scaling_groups.get(group, ()))
+
+    def topological_order(self, reverse=False):
+        """
+        Orders the node instances so that every node instance comes after
+        the targets of its relationships, i.e. in installation order.
+
+        Relationships targeting node instances which are not in the
+        topology are ignored.
+
+        :param reverse: Whether to return the uninstallation order instead.
+        :raises ValueError: if the relationships are cyclic.
+        :return: The ordered node instances.
+        """
+        dependencies = {}
+        dependents = {}
+        for node_instance_id in self._node_instances:
+            targets = [target_id for target_id
+                       in self._targets.get(node_instance_id, ())
+                       if target_id in self._node_instances]
+            dependencies[node_instance_id] = len(targets)
+            for target_id in targets:
+                dependents.setdefault(target_id, []).append(node_instance_id)
+        ready = deque(sorted(node_instance_id for node_instance_id, count
+                             in dependencies.items() if count == 0))
+        order = []
+        while ready:
+            node_instance_id = ready.popleft()
+            order.append(node_instance_id)
+            for dependent_id in dependents.get(node_instance_id, ()):
+                dependencies[dependent_id] -= 1
+                if dependencies[dependent_id] == 0:
+                    ready.append(dependent_id)
+        if len(order) != len(self._node_instances):
+            raise ValueError('Cyclic relationships in deployment {0}'
+                             .format(self.deployment_id))
+        if reverse:
+            order.reverse()
+        return self._get_all(order)
+
+    def _load_nodes(self):
+        self._nodes = {}
+        for page in iter_pages(self.client.nodes.list,
+                               page_size=self.page_size,
+                               deployment_id=self.deployment_id):
+            for node in page:
+                self._nodes[node.id] = node
+
+    def _get_all(self, node_instance_ids):
+        return [self._node_instances[node_instance_id]
+                for node_instance_id in node_instance_ids
+                if node_instance_id in self._node_instances]
+
+    def _clear_indexes(self):
+        self._instances_of_node = {}
+        self._container = {}
+        self._contained = {}
+        self._connected_to = {}
+        self._connected_from = {}
+        self._targets = {}
+        self._hosted_on = {}
+        self._scaling_groups = {}
+
+    def _index(self, node_instance):
+        node_instance_id = node_instance.id
+        self._instances_of_node.setdefault(
+            node_instance.node_id, []).append(node_instance_id)
+        host_id = node_instance.host_id
+        if host_id and host_id != node_instance_id:
+            self._hosted_on.setdefault(host_id, []).append(node_instance_id)
+        for group in node_instance.scaling_groups or ():
+            for key in (group.get('name'), group.get('id')):
+                if key:
+                    self._scaling_groups.setdefault(key, []).append(
+                        node_instance_id)
+        for relationship in node_instance.relationships or ():
+            target_id = relationship.get('target_id')
+            self._targets.setdefault(node_instance_id, set()).add(target_id)
+            if self._is_contained_in(node_instance, relationship):
+                self._container[node_instance_id] = target_id
+                self._contained.setdefault(target_id, []).append(
+                    node_instance_id)
+            else:
+                self._connected_to.setdefault(
+                    node_instance_id, []).append(target_id)
+                self._connected_from.setdefault(
+                    target_id, []).append(node_instance_id)
+
+    def _unindex(self, node_instance):
+        node_instance_id = node_instance.id
+        _remove(self._instances_of_node, node_instance.node_id,
+                node_instance_id)
+        _remove(self._hosted_on, node_instance.host_id, node_instance_id)
+        for group in node_instance.scaling_groups or ():
+            for key in (group.get('name'), group.get('id')):
+                _remove(self._scaling_groups, key, node_instance_id)
+        self._targets.pop(node_instance_id, None)
+        container_id = self._container.pop(node_instance_id, None)
+        if container_id is not None:
+            _remove(self._contained, container_id, node_instance_id)
+        for target_id in self._connected_to.pop(node_instance_id, ()):
+            _remove(self._connected_from, target_id, node_instance_id)
+
+    def _is_contained_in(self, node_instance, relationship):
+        relationship_type = relationship.get('type')
+        if relationship_type == CONTAINED_IN:
+            return True
+        # derived relationship types are resolved by the node's
+        # relationship, which holds the type hierarchy
+        node = self._nodes.get(node_instance.node_id)
+        for node_relationship in (node and node.relationships) or ():
+            if node_relationship.get('target_id') == \
+                    relationship.get('target_name') and \
+                    node_relationship.get('type') == relationship_type:
+                return CONTAINED_IN in (
+                    node_relationship.get('type_hierarchy') or ())
+        return False
+
+
+def _remove(index, key, node_instance_id):
+    node_instance_ids = index.get(key)
+    if node_instance_ids and node_instance_id in node_instance_ids:
+        node_instance_ids.remove(node_instance_id)
+        if not node_instance_ids:
+            del index[key]
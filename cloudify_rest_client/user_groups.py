@@ -13,10 +13,13 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
+from cloudify_rest_client.query import query_method
 from cloudify_rest_client.responses import ListResponse
 
 
 class Group(dict):
+    FIELDS = (
+        'id', 'name', 'users', 'tenants', 'ldap_dn')
 
     def __init__(self, group):
         super(Group, self).__init__()
@@ -56,6 +59,8 @@ class UserGroupsClient(object):
     def __init__(self, api):
         self.api = api
 
+    query = query_method(Group.FIELDS)
+
     def list(self, _include=None, sort=None, is_descending=False, **kwargs):
         """
         Returns a list of currently stored user groups.
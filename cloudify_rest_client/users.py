@@ -13,10 +13,15 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
+from cloudify_rest_client import utils
+from cloudify_rest_client.query import query_method
 from cloudify_rest_client.responses import ListResponse
 
 
 class User(dict):
+    FIELDS = (
+        'id', 'username', 'role', 'groups', 'tenants', 'active',
+        'last_login_at')
 
     def __init__(self, user):
         super(User, self).__init__()
@@ -70,6 +75,8 @@ class UsersClient(object):
     def __init__(self, api):
         self.api = api
 
+    query = query_method(User.FIELDS)
+
     def list(self, _include=None, sort=None, is_descending=False, **kwargs):
         """
         Returns a list of currently stored users.
@@ -91,6 +98,19 @@ class UsersClient(object):
         return ListResponse([User(item) for item in response['items']],
                             response['metadata'])
 
+    def count(self, **kwargs):
+        """
+        Returns the number of users matching the filters of `list`.
+        """
+        return utils.count(self.list, 'username', **kwargs)
+
+    def count_by(self, field, values, **kwargs):
+        """
+        Returns the number of users per value of `field`, see
+        `cloudify_rest_client.utils.count_by`.
+        """
+        return utils.count_by(self.count, field, values, **kwargs)
+
     def create(self, username, password, role):
         data = {'username': username, 'password': password, 'role': role}
         response = self.api.put('/users', data=data, expected_status_code=201)
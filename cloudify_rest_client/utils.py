@@ -1,8 +1,27 @@
+import io
 import os
+import re
+import time
+import zlib
 import tarfile
+import threading
+from datetime import datetime, timedelta
 from os.path import expanduser
+from multiprocessing.pool import ThreadPool
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
 
 SUPPORTED_ARCHIVE_TYPES = ['zip', 'tar', 'tar.gz', 'tar.bz2']
+DEFAULT_CONCURRENCY = 10
+ARCHIVE_CHUNK_SIZE = 64 * 1024
+ARCHIVE_QUEUED_CHUNKS = 16
+ARCHIVE_SAMPLE_SIZE = 64 * 1024
+ARCHIVE_SAMPLES = 4
+# 'Z', or a UTC offset such as '+02:00' or '-0530'
+UTC_OFFSET = re.compile(r'(Z|([+-])(\d{2}):?(\d{2}))$')
 
 
 def tar_blueprint(blueprint_path, dest_dir):
@@ -34,7 +53,381 @@ def tar_file(file_to_tar, destination_dir, tar_name=''):
     return tar_path
 
 
+def tar_blueprint_stream(blueprint_path, chunk_size=ARCHIVE_CHUNK_SIZE,
+                         queued_chunks=ARCHIVE_QUEUED_CHUNKS,
+                         progress_callback=None):
+    """
+    Streams a tar.gz archive of a blueprint dir, without writing it to disk.
+
+    The archive is built by a worker thread into a bounded queue of chunks,
+    so that compressing the blueprint and consuming the chunks (e.g.
+    uploading them) overlap. The archive has the same content as the one
+    created by `tar_blueprint`.
+
+    :param blueprint_path: the path to the blueprint.
+    :param chunk_size: size of the yielded chunks.
+    :param queued_chunks: maximum number of chunks built ahead of the
+                          consumer.
+    :param progress_callback: optional callable, called with the number of
+                              blueprint bytes archived so far and the total
+                              number of blueprint bytes.
+    :return: generator of the archive's chunks.
+    """
+    blueprint_path = expanduser(blueprint_path)
+    app_name = os.path.basename(os.path.splitext(blueprint_path)[0])
+    blueprint_directory = os.path.dirname(blueprint_path) or os.getcwd()
+    total_size = sum(os.path.getsize(path)
+                     for path in _iter_files(blueprint_directory))
+    chunks = queue.Queue(queued_chunks)
+    stopped = threading.Event()
+    writer = _ChunkWriter(chunks, chunk_size, stopped)
+
+    def build():
+        try:
+            with tarfile.open(fileobj=writer, mode='w|gz') as tar:
+                _add_to_tar(tar, blueprint_directory, app_name,
+                            writer.count_read)
+            writer.flush()
+            writer.put(_END_OF_ARCHIVE)
+        except _ArchiveStopped:
+            pass
+        except Exception as e:
+            try:
+                writer.put(_ArchiveError(e))
+            except _ArchiveStopped:
+                pass
+
+    worker = threading.Thread(target=build)
+    worker.daemon = True
+    worker.start()
+    try:
+        while True:
+            item = chunks.get()
+            if item is _END_OF_ARCHIVE:
+                return
+            if isinstance(item, _ArchiveError):
+                raise item.error
+            chunk, bytes_read = item
+            if progress_callback:
+                progress_callback(bytes_read, total_size)
+            yield chunk
+    finally:
+        # also stops the worker if the consumer stopped early
+        stopped.set()
+
+
+_END_OF_ARCHIVE = object()
+
+
+class _ArchiveError(object):
+
+    def __init__(self, error):
+        self.error = error
+
+
+class _ArchiveStopped(Exception):
+    pass
+
+
+class _ChunkWriter(object):
+    # file-like object putting what's written on a queue, in chunks
+
+    def __init__(self, chunks, chunk_size, stopped):
+        self._chunks = chunks
+        self._chunk_size = chunk_size
+        self._stopped = stopped
+        self._buffer = []
+        self._buffered = 0
+        self._read = 0
+
+    def count_read(self, size):
+        self._read += size
+
+    def write(self, data):
+        self._buffer.append(data)
+        self._buffered += len(data)
+        if self._buffered >= self._chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            chunk = b''.join(self._buffer)
+            self._buffer = []
+            self._buffered = 0
+            self.put((chunk, self._read))
+
+    def put(self, item):
+        while True:
+            if self._stopped.is_set():
+                raise _ArchiveStopped()
+            try:
+                self._chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+
+class _CountingReader(object):
+
+    def __init__(self, fileobj, count):
+        self._fileobj = fileobj
+        self._count = count
+
+    def read(self, size=-1):
+        data = self._fileobj.read(size)
+        self._count(len(data))
+        return data
+
+
+def _add_to_tar(tar, path, arcname, count_read):
+    # like tar.add, counting the bytes read from the added files
+    for entry_path, tarinfo in _iter_tar_entries(tar, path, arcname):
+        if tarinfo.isreg():
+            with open(entry_path, 'rb') as f:
+                tar.addfile(tarinfo, _CountingReader(f, count_read))
+        else:
+            tar.addfile(tarinfo)
+
+
+def _iter_tar_entries(tar, path, arcname):
+    # yields the (path, tarinfo) of the entries tar.add would add
+    tarinfo = tar.gettarinfo(path, arcname)
+    if tarinfo is None:
+        return
+    yield path, tarinfo
+    if tarinfo.isdir():
+        for name in sorted(os.listdir(path)):
+            for entry in _iter_tar_entries(tar, os.path.join(path, name),
+                                           os.path.join(arcname, name)):
+                yield entry
+
+
+def _iter_files(directory):
+    # yields the paths of the regular files under a directory
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            if os.path.isfile(path) and not os.path.islink(path):
+                yield path
+
+
+def estimate_tar_blueprint_size(blueprint_path,
+                                sample_size=ARCHIVE_SAMPLE_SIZE,
+                                samples=ARCHIVE_SAMPLES):
+    """
+    Estimates the size of the archive `tar_blueprint` would create, without
+    creating it.
+
+    The tar headers and the small files are compressed as a single stream,
+    as in the archive. Larger files are compressed in evenly spaced
+    samples, and the rest of their content is extrapolated from the
+    samples' compression ratio.
+
+    :param blueprint_path: the path to the blueprint.
+    :param sample_size: size of each sample.
+    :param samples: number of samples per file.
+    :return: the estimated archive size, in bytes.
+    """
+    blueprint_path = expanduser(blueprint_path)
+    app_name = os.path.basename(os.path.splitext(blueprint_path)[0])
+    blueprint_directory = os.path.dirname(blueprint_path) or os.getcwd()
+    tar = tarfile.open(fileobj=io.BytesIO(), mode='w')
+    compressor = zlib.compressobj(9)
+    compressed = 0
+    extrapolated = 0.0
+    for path, tarinfo in _iter_tar_entries(tar, blueprint_directory,
+                                           app_name):
+        header = tarinfo.tobuf(tar.format, tar.encoding, tar.errors)
+        compressed += len(compressor.compress(header))
+        if not tarinfo.isreg() or not tarinfo.size:
+            continue
+        with open(path, 'rb') as f:
+            if tarinfo.size <= sample_size * samples:
+                compressed += len(compressor.compress(f.read()))
+            else:
+                sampled, ratio = _sample_compression(
+                    f, tarinfo.size, sample_size, samples, compressor)
+                compressed += sampled
+                extrapolated += \
+                    (tarinfo.size - sample_size * samples) * ratio
+        # file data is padded with zeros to whole blocks
+        compressed += len(compressor.compress(
+            b'\0' * (-tarinfo.size % tarfile.BLOCKSIZE)))
+    # the end-of-archive blocks, and the padding of the last record, are
+    # zeros and compress to almost nothing
+    compressed += len(compressor.flush())
+    gzip_overhead = 18 + len(app_name) + len('.tar')
+    return int(compressed + extrapolated + gzip_overhead)
+
+
+def _sample_compression(f, size, sample_size, samples, compressor):
+    # compresses samples of a file into the archive's stream, and returns
+    # the size of their output and their compression ratio
+    step = (size - sample_size) // (samples - 1) if samples > 1 else 0
+    sample_compressor = zlib.compressobj(9)
+    sampled = 0
+    sample_compressed = 0
+    for i in range(samples):
+        f.seek(i * step)
+        data = f.read(sample_size)
+        sampled += len(compressor.compress(data))
+        sample_compressed += len(sample_compressor.compress(data))
+    sample_compressed += len(sample_compressor.flush())
+    return sampled, sample_compressed / float(sample_size * samples)
+
+
 def is_supported_archive_type(blueprint_path):
 
     extensions = ['.{0}'.format(ext) for ext in SUPPORTED_ARCHIVE_TYPES]
     return blueprint_path.endswith(tuple(extensions))
+
+
+def run_concurrently(func, items, concurrency=DEFAULT_CONCURRENCY):
+    """
+    Call `func` on each of the items using a bounded pool of threads.
+
+    :param func: callable accepting a single item.
+    :param items: iterable of items to process.
+    :param concurrency: maximum number of concurrent calls.
+    :return: list of the results, in the order of `items`.
+    """
+    items = list(items)
+    if len(items) < 2 or concurrency < 2:
+        return [func(item) for item in items]
+    pool = ThreadPool(min(concurrency, len(items)))
+    try:
+        return pool.map(func, items)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def count(list_method, include_field='id', **filters):
+    """
+    Count the resources matching the filters of a list method, without
+    transferring the resources themselves.
+
+    :param list_method: the list method of a client, e.g.
+                        `executions.list`.
+    :param include_field: the single field to include in the response, or
+                          None if the list method doesn't accept `_include`.
+    :param filters: filters accepted by the list method.
+    :return: the number of matching resources.
+    """
+    filters['_size'] = 1
+    filters.pop('_offset', None)
+    if include_field is not None:
+        filters['_include'] = [include_field]
+    return list_method(**filters).metadata.pagination.total
+
+
+def count_by(count, field, values, concurrency=DEFAULT_CONCURRENCY,
+             **filters):
+    """
+    Run a count query per value of a field, concurrently.
+
+    :param count: the count method of a client, e.g. `executions.count`.
+    :param field: the field to count by.
+    :param values: the values of `field` to count.
+    :param concurrency: maximum number of concurrent count queries.
+    :param filters: additional filters applied to every count query.
+    :return: dict mapping each value to its count.
+    """
+    values = list(values)
+
+    def _count(value):
+        value_filters = dict(filters)
+        value_filters[field] = value
+        return count(**value_filters)
+
+    return dict(zip(values, run_concurrently(_count, values, concurrency)))
+
+
+def parse_timestamp(value):
+    """
+    Parses a timestamp returned by the REST service, e.g.
+    '2017-04-19T10:31:15.123Z', '2017-04-19 10:31:15.123456' or
+    '2017-04-19T12:31:15+02:00'. Timestamps without a UTC offset are in
+    UTC.
+
+    :param value: the timestamp string (datetimes and None are returned
+                  as is).
+    :raises ValueError: if the timestamp is not in one of these formats.
+    :return: a naive datetime, in UTC.
+    """
+    if value is None or isinstance(value, datetime):
+        return value
+    value = value.strip().replace('T', ' ')
+    offset = timedelta()
+    match = UTC_OFFSET.search(value)
+    if match:
+        value = value[:match.start()]
+        sign, hours, minutes = match.group(2, 3, 4)
+        if sign:
+            offset = timedelta(hours=int(hours), minutes=int(minutes))
+            if sign == '-':
+                offset = -offset
+    time_format = '%Y-%m-%d %H:%M:%S.%f' if '.' in value \
+        else '%Y-%m-%d %H:%M:%S'
+    return datetime.strptime(value, time_format) - offset
+
+
+def split_time_range(from_datetime, to_datetime, parts=None, step=None):
+    """
+    Splits a time range into consecutive, non-overlapping sub-ranges.
+
+    :param from_datetime: start of the range (inclusive).
+    :param to_datetime: end of the range (inclusive).
+    :param parts: number of sub-ranges of equal length.
+    :param step: length of each sub-range, as a timedelta (the last one
+                 may be shorter). Either `parts` or `step` is required.
+    :return: list of (from_datetime, to_datetime) tuples, both inclusive.
+    """
+    if to_datetime < from_datetime:
+        raise ValueError('The end of the range precedes its start')
+    if step is None:
+        if not parts or parts < 1:
+            raise ValueError('Either parts or step is required')
+        step = (to_datetime - from_datetime) / parts
+    if step <= timedelta(0):
+        return [(from_datetime, to_datetime)]
+    ranges = []
+    start = from_datetime
+    while start <= to_datetime:
+        end = start + step
+        if end > to_datetime or len(ranges) + 1 == parts:
+            ranges.append((start, to_datetime))
+            break
+        # bounds are inclusive, so the next range starts right after
+        ranges.append((start, end - timedelta(microseconds=1)))
+        start = end
+    return ranges
+
+
+class RateLimiter(object):
+    """
+    Spaces out calls, possibly made from several threads, so that at most
+    `rate` calls start per second.
+    """
+
+    def __init__(self, rate=None):
+        """
+        :param rate: maximum number of calls per second, or None for no
+                     limit.
+        """
+        self.interval = 1.0 / rate if rate else 0
+        self._next_call = 0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """
+        Blocks until the next call may start.
+        """
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.time()
+            start = max(now, self._next_call)
+            self._next_call = start + self.interval
+        if start > now:
+            time.sleep(start - now)